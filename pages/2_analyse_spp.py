@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import seaborn as sns
 import json
 import folium
@@ -11,132 +10,113 @@ import numpy as np
 from streamlit_folium import folium_static
 import os
 
+from sdis.aggregates import add_icp_percentages, icp_table
+from sdis.bitmaps import build_bitmap_indexes
+from sdis.cache import filter_cache
+from sdis.charts import new_figure, show_cache_stats, show_chart
+from sdis.cube import build_cube, cube_selections, cube_table
+from sdis.density import (
+    build_histogram_edges,
+    histogram_density,
+    plot_histogram_density,
+    plot_stacked_histogram,
+    stacked_histogram,
+)
+from sdis.filters import (
+    CLASSES_AGE,
+    CLASSES_IMC,
+    CLASSES_LUC_LEGER,
+    apply_filters,
+    between,
+    classes,
+    count_rows,
+    filter_key,
+    isin,
+    isin_labels,
+)
+from sdis.loaders import SPP_CSV, load_spp
+from sdis.ranges import build_range_indexes
+from sdis.schema import observed_categories
+from sdis.snapshot import data_path, dataset_version, source_signature
+
+
+# Colonnes utilisées par la page : seules celles-ci sont lues depuis le
+# snapshot (matricule est conservé pour l'export des données filtrées)
+COLONNES = [
+    "cie",
+    "ut",
+    "age",
+    "matricule",
+    "sexe",
+    "aptitude générale",
+    "incendie et port de l'ari toutes missions",
+    "poids",
+    "taille",
+    "imc",
+    "périmètre abdominal",
+    "tension artérielle systol",
+    "tension artérielle diastol",
+    "luc léger",
+    "niveau luc léger",
+    "pompes",
+    "niveau pompes",
+    "tractions",
+    "niveau tractions",
+    "vo2max",
+    "vo2max_leger",
+    "couleur_globale",
+    "tranche_age",
+    "imc_cat",
+]
 
-# --- Chargement des données ---
-@st.cache_data()
-def load_data():
-    data_path = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "spp.csv")
-    )
-
-    df = pd.read_csv(data_path)
-
-    # Standardiser les noms de colonnes : minuscules, sans espace
-    df.columns = df.columns.str.strip().str.lower()
-
-    # Colonnes à convertir de 'xx,yy' → float
-    cols_to_fix = [
-        "poids",
-        "taille",
-        "imc",
-        "luc léger",
-        "tension artérielle systol",
-        "tension artérielle diastol",
-    ]
-    for col in cols_to_fix:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.replace(",", ".").astype(float)
-    df.loc[df["luc léger"] == 0, "niveau luc léger"] = 0
-
-    return df
-
-
-def niveau_to_couleur(niveau):
-    if pd.isna(niveau):
-        return "Inconnu"
-    if niveau >= 3:
-        return "Vert"
-    elif niveau == 2:
-        return "Orange"
-    elif niveau == 1:
-        return "Rouge"
-    else:
-        return "Inconnu"
-
-
-def score_to_couleur(score):
-    if pd.isna(score):
-        return "Inconnu"
-    if score >= 2.7:
-        return "Vert"
-    elif score >= 1.5:
-        return "Orange"
-    else:
-        return "Rouge"
-
-
-def age_to_categorie(age):
-    if pd.isna(age):
-        return "Inconnu"
-    elif age < 30:
-        return "16-29"
-    elif age < 40:
-        return "30-39"
-    elif age < 50:
-        return "40-49"
-    elif age <= 57:
-        return "50-57"
-    else:
-        return "58+"
-
+# Dimensions filtrées par liste déroulante, résolues par index bitmap
+DIMENSIONS = ["cie", "ut", "sexe", "aptitude générale"]
+# Dimensions du cube de comptage des niveaux ICP
+DIMENSIONS_CUBE = [
+    "cie",
+    "ut",
+    "sexe",
+    "aptitude générale",
+    "tranche_age",
+    "couleur_globale",
+]
+# Colonnes filtrées par curseur, résolues par index de plage
+PLAGES = [
+    "vo2max",
+    "vo2max_leger",
+    "tension artérielle systol",
+    "tension artérielle diastol",
+    "périmètre abdominal",
+    "poids",
+]
+# Histogrammes à bornes fixes sur tout le jeu de données : nombre de classes
+# ou règle de np.histogram_bin_edges
+HISTOGRAMMES = {
+    "vo2max": 20,
+    "vo2max_leger": 20,
+    "imc": "auto",
+    "taille": "auto",
+    "poids": "auto",
+}
 
-df = load_data()
-df.columns = df.columns.str.strip().str.lower()
 
+# --- Chargement des données ---
+# La table de base (données typées, nettoyées et indicateurs dérivés, tous
+# persistés dans le snapshot) est chargée une seule fois par processus tant
+# que le fichier source ne change pas, puis partagée, sans copie, entre toutes
+# les sessions (st.cache_resource). Elle est en lecture seule : la page n'y
+# écrit jamais, les données filtrées en sont des sous-ensembles.
+@st.cache_resource(show_spinner="Chargement des données...", max_entries=1)
+def load_data(signature):
+    df = load_spp(columns=COLONNES)
+    # Index des listes déroulantes (bitmap) et des curseurs (plage),
+    # construits une fois
+    indexes = build_bitmap_indexes(df, DIMENSIONS)
+    indexes.update(build_range_indexes(df, PLAGES))
+    return df, indexes
 
-# Ajoute dans le chargement si ce n’est pas fait :
-if "périmètre abdominal" in df.columns:
-    df["périmètre abdominal"] = (
-        df["périmètre abdominal"].astype(str).str.replace(",", ".").astype(float)
-    )
-df["taille"] = df["taille"].astype(str).str.replace(",", ".").astype(float)
-df.loc[(df["taille"] <= 100) | (df["taille"] > 250), "taille"] = None
-df["taille"] = df["taille"] / 100
-
-# Conversion propre
-df["luc léger"] = df["luc léger"].astype(str).str.replace(",", ".").astype(float)
-
-# Correction des erreurs de saisie (ex : 93 → 9.3)
-df.loc[df["luc léger"] > 20, "luc léger"] = df["luc léger"] / 10
-df["luc_leger_arrondi"] = df["luc léger"].round().astype("Int64")
-
-palier_to_vitesse = {
-    0: 8.0,
-    1: 8.5,
-    2: 9.0,
-    3: 9.5,
-    4: 10.0,
-    5: 10.5,
-    6: 11.0,
-    7: 11.5,
-    8: 12.0,
-    9: 12.5,
-    10: 13.0,
-    11: 13.5,
-    12: 14.0,
-    13: 14.5,
-    14: 15.0,
-    15: 15.5,
-    16: 16.0,
-}
-# Convertir sexe en numérique
-df["sexe_num"] = df["sexe"].str.upper().map(lambda x: 1 if x == "M" else 0).fillna(0)
-
-# Convertir palier Luc Léger en vitesse, 0 si NaN
-df["vitesse"] = df["luc léger"].map(palier_to_vitesse).fillna(0)
-
-# Calcul VO2max de la formule avec âge, sexe et vitesse
-df["vo2max"] = (
-    31.025
-    + 3.238 * df["vitesse"]
-    - 3.248 * df["age"].fillna(0)
-    + 6.318 * df["sexe_num"]
-)
-df["vo2max"] = df["vo2max"].clip(lower=0)
 
-# Formule de Léger (1988)
-df["vo2max_leger"] = (5.857 * df["vitesse"]).fillna(0) - 19.458
-df["vo2max_leger"] = df["vo2max_leger"].clip(lower=0)
+df, indexes = load_data(source_signature(data_path(SPP_CSV)))
 
 
 st.title("Analyse de la Condition Physique et de la Santé (spp)")
@@ -169,7 +149,8 @@ Utilisez les filtres pour explorer les données :
 ---
 
 #### 📊 2. Visualisations proposées
-Plusieurs visualisations sont générées à partir des données filtrées :
+Plusieurs visualisations sont générées à partir des données filtrées, regroupées en
+sections : choisissez la section à afficher au-dessus des graphiques.
 
 - **Histogrammes simples** : poids, taille, IMC, VO2max.
 - **Histogrammes empilés** :
@@ -202,244 +183,208 @@ Plusieurs visualisations sont générées à partir des données filtrées :
 """
     )
 
+with st.expander("🧹 Rapport de nettoyage des données", expanded=False):
+    st.markdown(
+        "Corrections appliquées une seule fois au chargement du fichier source :"
+    )
+    st.table(
+        pd.Series(df.attrs.get("anomalies", {}), name="Lignes corrigées", dtype="int64")
+    )
+
 
 # --- SIDEBAR ---
 st.sidebar.header("Filtres dynamiques")
-cie = st.sidebar.multiselect("Cie:", df["cie"].dropna().unique())
-ut = st.sidebar.multiselect("UT:", df["ut"].dropna().unique())
-sexe_options = st.sidebar.multiselect(
-    "sexe :", df["sexe"].dropna().unique(), default=df["sexe"].dropna().unique()
-)
-st.sidebar.markdown("**Abtitude générale**")
-aptitude = st.sidebar.multiselect(
-    "Aptitude Générale :",
-    options=sorted(df["aptitude générale"].dropna().unique()),
-    default=sorted(df["aptitude générale"].dropna().unique()),
-)
 
-# --- Filtre VO2max ---
-if "vo2max" in df.columns:
-    st.sidebar.markdown("**VO2max**")
-    vo2_min, vo2_max = st.sidebar.slider(
-        "Sélectionnez une plage de VO2max :",
-        min_value=float(df["vo2max"].min()),
-        max_value=float(df["vo2max"].max()),
-        value=(float(df["vo2max"].min()), float(df["vo2max"].max())),
-        step=1.0,
-    )
 
-# --- Filtre VO2max Léger ---
-if "vo2max_leger" in df.columns:
-    st.sidebar.markdown("**VO2max Léger (Formule 1988)**")
-    vo2l_min, vo2l_max = st.sidebar.slider(
-        "Plage VO2max (Léger 1988) :",
-        min_value=float(df["vo2max_leger"].min()),
-        max_value=float(df["vo2max_leger"].max()),
-        value=(float(df["vo2max_leger"].min()), float(df["vo2max_leger"].max())),
-        step=1.0,
+def sidebar_filters():
+    """Widgets de la barre latérale → liste de filtres (sdis.filters)."""
+    cie = st.multiselect("Cie:", df["cie"].dropna().unique())
+    ut = st.multiselect("UT:", df["ut"].dropna().unique())
+    sexe_options = st.multiselect(
+        "sexe :", df["sexe"].dropna().unique(), default=df["sexe"].dropna().unique()
     )
-
-
-# Slider pour tension artérielle systolique
-# Nettoyage des colonnes de tension artérielle
-if "tension artérielle systol" in df.columns:
-    df["tension artérielle systol"] = (
-        df["tension artérielle systol"].astype(str).str.replace(",", ".").astype(float)
+    st.markdown("**Abtitude générale**")
+    aptitude = st.multiselect(
+        "Aptitude Générale :",
+        options=sorted(df["aptitude générale"].dropna().unique()),
+        default=sorted(df["aptitude générale"].dropna().unique()),
     )
-    # Correction des valeurs aberrantes : si > 250, on divise par 10
-    df.loc[df["tension artérielle systol"] > 250, "tension artérielle systol"] /= 10
 
-if "tension artérielle diastol" in df.columns:
-    df["tension artérielle diastol"] = (
-        df["tension artérielle diastol"].astype(str).str.replace(",", ".").astype(float)
-    )
-    # Correction des valeurs aberrantes : si > 150, on divise par 10
-    df.loc[df["tension artérielle diastol"] > 150, "tension artérielle diastol"] /= 10
-
-if "tension artérielle systol" in df.columns:
-    st.sidebar.markdown("**Tension Artérielle Systolique (mmHg)**")
-    sys_min, sys_max = st.sidebar.slider(
-        "Sélectionnez une plage pour la tension systolique :",
-        min_value=float(df["tension artérielle systol"].min()),
-        max_value=float(df["tension artérielle systol"].max()),
-        value=(
-            float(df["tension artérielle systol"].min()),
-            float(df["tension artérielle systol"].max()),
-        ),
-    )
+    # --- Filtre VO2max ---
+    if "vo2max" in df.columns:
+        st.markdown("**VO2max**")
+        vo2_min, vo2_max = st.slider(
+            "Sélectionnez une plage de VO2max :",
+            min_value=float(df["vo2max"].min()),
+            max_value=float(df["vo2max"].max()),
+            value=(float(df["vo2max"].min()), float(df["vo2max"].max())),
+            step=1.0,
+        )
 
-# Slider pour tension artérielle diastolique
-if "tension artérielle diastol" in df.columns:
-    st.sidebar.markdown("**Tension Artérielle Diastolique (mmHg)**")
-    dia_min, dia_max = st.sidebar.slider(
-        "Sélectionnez une plage pour la tension diastolique :",
-        min_value=float(df["tension artérielle diastol"].min()),
-        max_value=float(df["tension artérielle diastol"].max()),
-        value=(
-            float(df["tension artérielle diastol"].min()),
-            float(df["tension artérielle diastol"].max()),
-        ),
-    )
+    # --- Filtre VO2max Léger ---
+    if "vo2max_leger" in df.columns:
+        st.markdown("**VO2max Léger (Formule 1988)**")
+        vo2l_min, vo2l_max = st.slider(
+            "Plage VO2max (Léger 1988) :",
+            min_value=float(df["vo2max_leger"].min()),
+            max_value=float(df["vo2max_leger"].max()),
+            value=(float(df["vo2max_leger"].min()), float(df["vo2max_leger"].max())),
+            step=1.0,
+        )
 
+    # Slider pour tension artérielle systolique
+    if "tension artérielle systol" in df.columns:
+        st.markdown("**Tension Artérielle Systolique (mmHg)**")
+        sys_min, sys_max = st.slider(
+            "Sélectionnez une plage pour la tension systolique :",
+            min_value=float(df["tension artérielle systol"].min()),
+            max_value=float(df["tension artérielle systol"].max()),
+            value=(
+                float(df["tension artérielle systol"].min()),
+                float(df["tension artérielle systol"].max()),
+            ),
+        )
 
-st.sidebar.markdown("**Age - Catégories**")
-age_category = st.sidebar.multiselect(
-    "Selectionnez une catégorie d'Age : ",
-    [
-        "Tous",
-        "16 à 29",
-        "30 à 39",
-        "40 à 49",
-        "50 à 57",
-        "plus de 57",
-    ],
-)
-st.sidebar.markdown("**imc - Catégories**")
-imc_category = st.sidebar.multiselect(
-    "Sélectionnez une catégorie d'imc :",
-    [
-        "Tous",
-        "Normal (18.5 - 24.9)",
-        "Surpoids (25.0 - 29.9)",
-        "Obésité modérée (30.0 - 34.9)",
-        "Obésité sévère (35.0 - 39.9)",
-        "Obésité massive (>40)",
-    ],
-)
+    # Slider pour tension artérielle diastolique
+    if "tension artérielle diastol" in df.columns:
+        st.markdown("**Tension Artérielle Diastolique (mmHg)**")
+        dia_min, dia_max = st.slider(
+            "Sélectionnez une plage pour la tension diastolique :",
+            min_value=float(df["tension artérielle diastol"].min()),
+            max_value=float(df["tension artérielle diastol"].max()),
+            value=(
+                float(df["tension artérielle diastol"].min()),
+                float(df["tension artérielle diastol"].max()),
+            ),
+        )
 
-# --- Filtre Tour de Taille ---
-if "périmètre abdominal" in df.columns:
-    st.sidebar.markdown("**Tour de Taille (cm)**")
-    tour_min, tour_max = st.sidebar.slider(
-        "Sélectionnez une plage pour le tour de taille :",
-        min_value=float(df["périmètre abdominal"].min()),
-        max_value=float(df["périmètre abdominal"].max()),
-        value=(
-            float(df["périmètre abdominal"].min()),
-            float(df["périmètre abdominal"].max()),
-        ),
-        step=1.0,
+    st.markdown("**Age - Catégories**")
+    age_category = st.multiselect(
+        "Selectionnez une catégorie d'Age : ",
+        [
+            "Tous",
+            "16 à 29",
+            "30 à 39",
+            "40 à 49",
+            "50 à 57",
+            "plus de 57",
+        ],
+    )
+    st.markdown("**imc - Catégories**")
+    imc_category = st.multiselect(
+        "Sélectionnez une catégorie d'imc :",
+        [
+            "Tous",
+            "Normal (18.5 - 24.9)",
+            "Surpoids (25.0 - 29.9)",
+            "Obésité modérée (30.0 - 34.9)",
+            "Obésité sévère (35.0 - 39.9)",
+            "Obésité massive (>40)",
+        ],
     )
 
-poids_min, poids_max = st.sidebar.slider(
-    "poids:", float(df["poids"].min()), float(df["poids"].max()), (0.0, 144.0)
-)
+    # --- Filtre Tour de Taille ---
+    if "périmètre abdominal" in df.columns:
+        st.markdown("**Tour de Taille (cm)**")
+        tour_min, tour_max = st.slider(
+            "Sélectionnez une plage pour le tour de taille :",
+            min_value=float(df["périmètre abdominal"].min()),
+            max_value=float(df["périmètre abdominal"].max()),
+            value=(
+                float(df["périmètre abdominal"].min()),
+                float(df["périmètre abdominal"].max()),
+            ),
+            step=1.0,
+        )
 
-st.sidebar.markdown("**Luc Léger - Paliers**")
-luc_leger_categories = st.sidebar.multiselect(
-    "Sélectionnez une ou plusieurs catégories de palier Luc Léger :",
-    ["0", "1", "2", "3", "4", "5", "plus de 6"],
-)
+    poids_min, poids_max = st.slider(
+        "poids:", float(df["poids"].min()), float(df["poids"].max()), (0.0, 144.0)
+    )
 
-# --- Application des filtres ---
+    st.markdown("**Luc Léger - Paliers**")
+    luc_leger_categories = st.multiselect(
+        "Sélectionnez une ou plusieurs catégories de palier Luc Léger :",
+        ["0", "1", "2", "3", "4", "5", "plus de 6"],
+    )
 
-df_filtered = df.copy()
-if cie:
-    df_filtered = df_filtered[df_filtered["cie"].isin(cie)]
-if ut:
-    df_filtered = df_filtered[df_filtered["ut"].isin(ut)]
+    # Tous les filtres sont combinés en un seul masque booléen sur la table de
+    # base : une seule vue filtrée est créée à chaque exécution.
+    return [
+        isin("cie", cie),
+        isin("ut", ut),
+        isin("aptitude générale", aptitude),
+        isin("sexe", sexe_options),
+        between("vo2max", vo2_min, vo2_max, fillna=0),
+        between("vo2max_leger", vo2l_min, vo2l_max, fillna=0),
+        between("périmètre abdominal", tour_min, tour_max),
+        between("tension artérielle systol", sys_min, sys_max),
+        between("tension artérielle diastol", dia_min, dia_max),
+        between("poids", poids_min, poids_max),
+        isin_labels("tranche_age", age_category, CLASSES_AGE),
+        isin_labels("imc_cat", imc_category, CLASSES_IMC),
+        classes("luc léger", luc_leger_categories, CLASSES_LUC_LEGER),
+    ]
 
-if aptitude:
-    df_filtered = df_filtered[df_filtered["aptitude générale"].isin(aptitude)]
 
+# Mode transactionnel : les modifications sont mises en attente (seule la
+# barre latérale est réexécutée, avec le nombre d'individus que le filtre
+# sélectionnerait) puis appliquées en un seul recalcul des graphiques
+mode_transaction = st.sidebar.toggle(
+    "Appliquer les filtres en une fois",
+    key="transaction_spp",
+    help="Regroupe plusieurs modifications de filtres en un seul recalcul.",
+)
 
-# Filtrage VO2max
-df_filtered = df_filtered[
-    (df_filtered["vo2max"].fillna(0) >= vo2_min)
-    & (df_filtered["vo2max"].fillna(0) <= vo2_max)
-]
 
-# ✅ Corrigé ici : filtrage VO2max_Léger avec les bonnes valeurs
-df_filtered = df_filtered[
-    (df_filtered["vo2max_leger"].fillna(0) >= vo2l_min)
-    & (df_filtered["vo2max_leger"].fillna(0) <= vo2l_max)
-]
+@st.fragment
+def pending_filters():
+    filtres = sidebar_filters()
+    st.caption(f"Filtres en attente : {count_rows(df, filtres, indexes)} individus")
+    appliquer = st.button("✅ Appliquer les filtres")
+    if appliquer or "filtres_spp" not in st.session_state:
+        st.session_state["filtres_spp"] = filtres
+        if appliquer:
+            st.rerun()
 
-df_filtered["couleur_luc"] = df_filtered["niveau luc léger"].apply(niveau_to_couleur)
-df_filtered["couleur_pompes"] = df_filtered["niveau pompes"].apply(niveau_to_couleur)
-df_filtered["couleur_tractions"] = df_filtered["niveau tractions"].apply(
-    niveau_to_couleur
-)
-df_filtered["score_moyen"] = df_filtered[
-    ["niveau luc léger", "niveau pompes", "niveau tractions"]
-].mean(axis=1)
-df_filtered["couleur_globale"] = df_filtered["score_moyen"].apply(score_to_couleur)
-df_filtered["tranche_age"] = df_filtered["age"].apply(age_to_categorie)
-
-if "périmètre abdominal" in df_filtered.columns:
-    df_filtered = df_filtered[
-        (df_filtered["périmètre abdominal"] >= tour_min)
-        & (df_filtered["périmètre abdominal"] <= tour_max)
-    ]
 
-if luc_leger_categories:
-    filtres_luc = []
-    for cat in luc_leger_categories:
-        if cat == "0":
-            filtres_luc.append(df_filtered["luc léger"] == 0)
-        elif cat == "1":
-            filtres_luc.append(df_filtered["luc léger"] == 1)
-        elif cat == "2":
-            filtres_luc.append(df_filtered["luc léger"] == 2)
-        elif cat == "3":
-            filtres_luc.append(df_filtered["luc léger"] == 3)
-        elif cat == "4":
-            filtres_luc.append(df_filtered["luc léger"] == 4)
-        elif cat == "5":
-            filtres_luc.append(df_filtered["luc léger"] == 5)
-        elif cat == "plus de 6":
-            filtres_luc.append(df_filtered["luc léger"] >= 6)
-
-    if filtres_luc:
-        df_filtered = df_filtered[pd.concat(filtres_luc, axis=1).any(axis=1)]
-# Application des filtres de tension artérielle
-if "tension artérielle systol" in df_filtered.columns:
-    df_filtered = df_filtered[
-        (df_filtered["tension artérielle systol"] >= sys_min)
-        & (df_filtered["tension artérielle systol"] <= sys_max)
-    ]
+with st.sidebar:
+    if mode_transaction:
+        pending_filters()
+    else:
+        st.session_state["filtres_spp"] = sidebar_filters()
+filtres = st.session_state["filtres_spp"]
 
-if "tension artérielle diastol" in df_filtered.columns:
-    df_filtered = df_filtered[
-        (df_filtered["tension artérielle diastol"] >= dia_min)
-        & (df_filtered["tension artérielle diastol"] <= dia_max)
-    ]
+# --- Application des filtres ---
+# Les masques de chaque filtre sont gardés dans la session : seul le filtre
+# dont le widget a changé est réévalué
+version = dataset_version(df)
+df_filtered = apply_filters(
+    df,
+    filtres,
+    indexes,
+    cache=filter_cache(),
+    version=version,
+    state=st.session_state.setdefault("masques_spp", {}),
+)
 
+show_cache_stats()
 
-df_filtered = df_filtered[
-    (df_filtered["poids"] >= poids_min) & (df_filtered["poids"] <= poids_max)
-]
+# Les graphiques ne dépendent que des données filtrées : ils sont mis en cache
+# par (identifiant, version du jeu de données, empreinte des filtres)
+empreinte_filtres = filter_key(filtres)
 
 
-if sexe_options:
-    df_filtered = df_filtered[df_filtered["sexe"].isin(sexe_options)]
+# Bornes des histogrammes, calculées une fois par version du jeu de données
+@st.cache_resource
+def histogram_edges(_df, version):
+    return build_histogram_edges(_df, HISTOGRAMMES)
 
 
-# Application du filtre imc par classe
-if imc_category:
-    filtres_imc = []
-    for cat in imc_category:
-        if "Normal" in cat:
-            filtres_imc.append(
-                (df_filtered["imc"] >= 18.5) & (df_filtered["imc"] <= 24.9)
-            )
-        elif "Surpoids" in cat:
-            filtres_imc.append(
-                (df_filtered["imc"] >= 25.0) & (df_filtered["imc"] <= 29.9)
-            )
-        elif "modérée" in cat:
-            filtres_imc.append(
-                (df_filtered["imc"] >= 30.0) & (df_filtered["imc"] <= 34.9)
-            )
-        elif "sévère" in cat:
-            filtres_imc.append(
-                (df_filtered["imc"] >= 35.0) & (df_filtered["imc"] <= 39.9)
-            )
-        elif "massive" in cat:
-            filtres_imc.append(df_filtered["imc"] >= 40.0)
-
-    if filtres_imc:
-        df_filtered = df_filtered[pd.concat(filtres_imc, axis=1).any(axis=1)]
+# Comptages et densité (KDE par FFT) des données filtrées, par état de filtres
+@st.cache_data(max_entries=64)
+def distribution(version, empreinte, col, _df_filtered):
+    edges = histogram_edges(df, version)[col]
+    return histogram_density(_df_filtered[col].to_numpy(dtype=float), edges)
 
 
 # --- VISUALISATIONS ---
@@ -447,454 +392,586 @@ st.subheader("Statistiques Globales sur les Données Filtrées")
 st.write(f"Nombre d'individus: {df_filtered.shape[0]}")
 
 
-st.subheader("Distribution de l’imc empilée selon le niveau luc léger")
+# Cube de comptage construit une fois par version du jeu de données
+@st.cache_resource
+def icp_cube(_df, version):
+    return build_cube(_df, DIMENSIONS_CUBE)
 
-if "imc" in df_filtered.columns and "niveau luc léger" in df_filtered.columns:
-    df_imc = df_filtered[["imc", "niveau luc léger"]].dropna()
 
-    # Définir les bins
-    bins = np.histogram_bin_edges(df_imc["imc"], bins=20)
-    bin_centers = 0.5 * (bins[1:] + bins[:-1])
+@st.cache_data
+def load_geojson():
+    geo_path = os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", "alsace_map.geojson")
+    )
+    with open(geo_path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-    # Initialiser les comptages pour chaque niveau
-    niveaux = [1, 2, 3]
-    couleurs = {1: "red", 2: "orange", 3: "green"}
-    bar_data = {
-        niv: np.histogram(df_imc[df_imc["niveau luc léger"] == niv]["imc"], bins=bins)[
-            0
-        ]
-        for niv in niveaux
-    }
 
-    # Créer le graphique empilé
-    fig, ax = plt.subplots(figsize=(10, 6))
-    bottom = np.zeros_like(bin_centers)
-    for niv in niveaux:
-        ax.bar(
-            bin_centers,
-            bar_data[niv],
-            width=np.diff(bins),
-            bottom=bottom,
-            color=couleurs[niv],
-            edgecolor="black",
-            label=f"Niveau {niv}",
-        )
-        bottom += bar_data[niv]
-
-    ax.set_title("Distribution empilée de l’imc par niveau luc léger")
-    ax.set_xlabel("imc")
-    ax.set_ylabel("Nombre d’individus")
-    ax.legend(title="niveau luc léger")
-    st.pyplot(fig)
-else:
-    st.info(
-        "Les données nécessaires pour afficher cette visualisation sont incomplètes."
-    )
+def section_imc_luc_leger():
+    st.subheader("Distribution de l’imc empilée selon le niveau luc léger")
 
-st.subheader("Distribution du Palier Luc Léger par Catégorie d'IMC")
-
-if "luc léger" in df_filtered.columns and "imc" in df_filtered.columns:
-    # 1. Créer la catégorie d’IMC
-    def classify_imc(imc):
-        if pd.isna(imc):
-            return "Inconnu"
-        elif imc < 18.5:
-            return "Insuffisance pondérale"
-        elif imc >= 18.5 and imc <= 25.0:
-            return "Normal"
-        elif imc >= 25 and imc <= 29.9:
-            return "Surpoids"
-        elif imc >= 30 and imc <= 34.9:
-            return "Obésité modérée"
-        elif imc >= 35.0 and imc <= 39.9:
-            return "Obésité sévère"
-        else:
-            return "Obésité massive"
+    if "imc" in df_filtered.columns and "niveau luc léger" in df_filtered.columns:
 
-    df_viz = df_filtered[["luc léger", "imc"]].dropna()
-    if df_viz.empty:
-        st.info("Aucune donnée disponible pour cette combinaison de filtres.")
-    else:
-        df_viz["imc_cat"] = df_viz["imc"].apply(classify_imc)
-
-        palette = {
-            "Normal": "green",
-            "Surpoids": "orange",
-            "Obésité modérée": "red",
-            "Obésité sévère": "darkred",
-            "Obésité massive": "black",
-            "Insuffisance pondérale": "blue",
-            "Inconnu": "gray",
-        }
-
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.histplot(
-            data=df_viz,
-            x="luc léger",
-            hue="imc_cat",
-            multiple="stack",
-            palette=palette,
-            bins=15,
-            edgecolor="white",
-        )
-        ax.set_title("Distribution du Palier Luc Léger par Catégorie d'IMC")
-        ax.set_xlabel("Palier Luc Léger")
-        ax.set_ylabel("Nombre d'individus")
-        st.pyplot(fig)
-else:
-    st.warning("Les colonnes nécessaires 'luc léger' et 'imc' sont manquantes.")
-
-st.subheader("Distribution du Tour de Taille selon le Sexe et les Normes de Santé")
-
-if "périmètre abdominal" in df_filtered.columns and "sexe" in df_filtered.columns:
-    df_tour = df_filtered[["périmètre abdominal", "sexe"]].dropna()
-
-    def couleur_tour(row):
-        sexe = str(row["sexe"]).lower()
-        tour = row["périmètre abdominal"]
-        if sexe == "m":
-            return "green" if tour < 94 else "red"
-        elif sexe == "f":
-            return "green" if tour < 80 else "red"
-        else:
-            return "gray"
+        def histogramme_imc_luc_leger():
+            df_imc = df_filtered[["imc", "niveau luc léger"]].dropna()
 
-    df_tour["couleur"] = df_tour.apply(couleur_tour, axis=1)
+            # Définir les bins
+            bins = np.histogram_bin_edges(df_imc["imc"], bins=20)
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-    for couleur in ["green", "red", "gray"]:
-        subset = df_tour[df_tour["couleur"] == couleur]
-        if not subset.empty:
-            ax.hist(
-                subset["périmètre abdominal"],
-                bins=15,
-                alpha=0.7,
-                label=couleur.capitalize(),
-                color=couleur,
+            # Comptages (classe d'imc × niveau) en un seul passage
+            niveaux = [1, 2, 3]
+            couleurs = {1: "red", 2: "orange", 3: "green"}
+            bar_data = stacked_histogram(
+                df_imc["imc"].to_numpy(dtype=float),
+                df_imc["niveau luc léger"].to_numpy(dtype=float) - niveaux[0],
+                bins,
+                len(niveaux),
+            )
+
+            # Créer le graphique empilé
+            fig, ax = new_figure(figsize=(10, 6))
+            plot_stacked_histogram(
+                ax,
+                bins,
+                bar_data,
+                [f"Niveau {niv}" for niv in niveaux],
+                [couleurs[niv] for niv in niveaux],
                 edgecolor="black",
             )
 
-    ax.set_title("Distribution du Tour de Taille (coloré selon les seuils OMS)")
-    ax.set_xlabel("Tour de Taille (cm)")
-    ax.set_ylabel("Nombre d'individus")
-    ax.legend(title="État de santé")
-    st.pyplot(fig)
-else:
-    st.warning(
-        "La colonne 'périmètre abdominal' ou 'sexe' est manquante dans les données."
-    )
-st.subheader("Distribution de la VO2max")
-if "vo2max" in df_filtered.columns and not df_filtered["vo2max"].dropna().empty:
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.histplot(df_filtered["vo2max"], kde=True, bins=20, color="purple")
-    ax.set_title("Distribution de la VO2max")
-    ax.set_xlabel("VO2max (ml/kg/min)")
-    ax.set_ylabel("Nombre d'individus")
-    st.pyplot(fig)
-
-
-st.subheader("Nuage de points : VO2max en fonction de l'âge")
-
-if "vo2max" in df_filtered.columns and "age" in df_filtered.columns:
-    df_vo2_age = df_filtered[["vo2max", "age"]].dropna()
-
-    if not df_vo2_age.empty:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.scatterplot(data=df_vo2_age, x="age", y="vo2max", alpha=0.6)
-        sns.regplot(
-            data=df_vo2_age,
-            x="age",
-            y="vo2max",
-            scatter=False,
-            color="red",
-            label="Tendance",
+            ax.set_title("Distribution empilée de l’imc par niveau luc léger")
+            ax.set_xlabel("imc")
+            ax.set_ylabel("Nombre d’individus")
+            ax.legend(title="niveau luc léger")
+            return fig
+
+        show_chart(
+            "imc_luc_leger", histogramme_imc_luc_leger, version, empreinte_filtres
         )
-        ax.set_title("Relation entre l'âge et la VO2max")
-        ax.set_xlabel("Âge (ans)")
-        ax.set_ylabel("VO2max (ml/kg/min)")
-        ax.legend()
-        st.pyplot(fig)
     else:
-        st.info("Aucune donnée VO2max et âge disponible pour l'affichage.")
-else:
-    st.warning("Les colonnes nécessaires 'vo2max' et 'age' sont manquantes.")
-
-
-st.subheader("Relation entre l'âge et la VO2max (Formule de Léger 1988)")
-
-if "vo2max_leger" in df_filtered.columns and "age" in df_filtered.columns:
-    df_vo2_leger_age = df_filtered[["vo2max_leger", "age"]].dropna()
-
-    if not df_vo2_leger_age.empty:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.scatterplot(data=df_vo2_leger_age, x="age", y="vo2max_leger", alpha=0.6)
-        sns.regplot(
-            data=df_vo2_leger_age,
-            x="age",
-            y="vo2max_leger",
-            scatter=False,
-            color="green",
-            label="Tendance",
+        st.info(
+            "Les données nécessaires pour afficher cette visualisation sont incomplètes."
         )
-        ax.set_title("Relation entre l'âge et la VO2max (Formule Léger 1988)")
-        ax.set_xlabel("Âge (ans)")
-        ax.set_ylabel("VO2max (ml/kg/min)")
-        ax.legend()
-        st.pyplot(fig)
-    else:
-        st.info("Aucune donnée disponible pour VO2max (Léger) et âge.")
-else:
-    st.warning("Les colonnes 'vo2max_leger' et 'age' sont manquantes.")
-st.subheader("Distribution de la VO2max - Formule de Léger (1988)")
-
-if (
-    "vo2max_leger" in df_filtered.columns
-    and not df_filtered["vo2max_leger"].dropna().empty
-):
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.histplot(df_filtered["vo2max_leger"], kde=True, bins=20, color="teal")
-    ax.set_title("Distribution de la VO2max (Formule Léger 1988)")
-    ax.set_xlabel("VO2max Léger (ml/kg/min)")
-    ax.set_ylabel("Nombre d'individus")
-    st.pyplot(fig)
-else:
-    st.info("Aucune donnée VO2max (formule Léger) disponible pour l'affichage.")
-
-features = [
-    "imc",
-    "taille",
-    "poids",
-]
 
+    st.subheader("Distribution du Palier Luc Léger par Catégorie d'IMC")
 
-for feature in features:
-    st.subheader(f"Distribution de {feature.upper()}")
-    if feature in df_filtered.columns and not df_filtered[feature].dropna().empty:
-        fig, ax = plt.subplots()
-        sns.histplot(df_filtered[feature], kde=True, ax=ax)
-        ax.set_title(f"Histogramme de {feature.upper()}")
-        st.pyplot(fig)
+    if "luc léger" in df_filtered.columns and "imc" in df_filtered.columns:
+        # La catégorie d’IMC (imc_cat) est précalculée au chargement
+        df_viz = df_filtered[["luc léger", "imc", "imc_cat"]].dropna()
+        if df_viz.empty:
+            st.info("Aucune donnée disponible pour cette combinaison de filtres.")
+        else:
+
+            def histogramme_luc_leger_imc():
+                palette = {
+                    "Normal": "green",
+                    "Surpoids": "orange",
+                    "Obésité modérée": "red",
+                    "Obésité sévère": "darkred",
+                    "Obésité massive": "black",
+                    "Insuffisance pondérale": "blue",
+                    "Inconnu": "gray",
+                }
+
+                # Comptages (classe de palier × catégorie d'imc) en un seul
+                # passage sur les codes de la catégorielle
+                categories = observed_categories(df_viz["imc_cat"])
+                codes = df_viz["imc_cat"].cat.set_categories(categories).cat.codes
+                bins = np.histogram_bin_edges(df_viz["luc léger"], bins=15)
+                counts = stacked_histogram(
+                    df_viz["luc léger"].to_numpy(dtype=float),
+                    codes.to_numpy(),
+                    bins,
+                    len(categories),
+                )
+
+                fig, ax = new_figure(figsize=(10, 6))
+                plot_stacked_histogram(
+                    ax,
+                    bins,
+                    counts,
+                    categories,
+                    [palette[c] for c in categories],
+                    edgecolor="white",
+                )
+                ax.legend(title="imc_cat")
+                ax.set_title("Distribution du Palier Luc Léger par Catégorie d'IMC")
+                ax.set_xlabel("Palier Luc Léger")
+                ax.set_ylabel("Nombre d'individus")
+                return fig
+
+            show_chart(
+                "luc_leger_imc", histogramme_luc_leger_imc, version, empreinte_filtres
+            )
     else:
-        st.info(f"Aucune donnée disponible pour {feature.upper()}.")
-
-phys_tests = ["luc léger", "pompes", "tractions"]
-for test in phys_tests:
-    st.subheader(f"{test.replace('_', ' ').title()} par Cie")
-    if not df_filtered.empty and test in df_filtered.columns:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.boxplot(x="cie", y=test, data=df_filtered, ax=ax, palette="Set2")
-        ax.set_xticklabels(ax.get_xticklabels(), rotation=45)
-        st.pyplot(fig)
+        st.warning("Les colonnes nécessaires 'luc léger' et 'imc' sont manquantes.")
+
+
+def section_tour_de_taille():
+    st.subheader("Distribution du Tour de Taille selon le Sexe et les Normes de Santé")
+
+    if "périmètre abdominal" in df_filtered.columns and "sexe" in df_filtered.columns:
+
+        def couleur_tour(row):
+            sexe = str(row["sexe"]).lower()
+            tour = row["périmètre abdominal"]
+            if sexe == "m":
+                return "green" if tour < 94 else "red"
+            elif sexe == "f":
+                return "green" if tour < 80 else "red"
+            else:
+                return "gray"
+
+        def histogramme_tour_de_taille():
+            df_tour = df_filtered[["périmètre abdominal", "sexe"]].dropna()
+            df_tour["couleur"] = df_tour.apply(couleur_tour, axis=1)
+
+            fig, ax = new_figure(figsize=(10, 6))
+            for couleur in ["green", "red", "gray"]:
+                subset = df_tour[df_tour["couleur"] == couleur]
+                if not subset.empty:
+                    ax.hist(
+                        subset["périmètre abdominal"],
+                        bins=15,
+                        alpha=0.7,
+                        label=couleur.capitalize(),
+                        color=couleur,
+                        edgecolor="black",
+                    )
+
+            ax.set_title("Distribution du Tour de Taille (coloré selon les seuils OMS)")
+            ax.set_xlabel("Tour de Taille (cm)")
+            ax.set_ylabel("Nombre d'individus")
+            ax.legend(title="État de santé")
+            return fig
+
+        show_chart(
+            "tour_de_taille", histogramme_tour_de_taille, version, empreinte_filtres
+        )
     else:
-        st.info(f"Aucune donnée disponible pour {test}.")
+        st.warning(
+            "La colonne 'périmètre abdominal' ou 'sexe' est manquante dans les données."
+        )
 
 
-st.subheader("Relation entre l'âge et le palier Luc Léger")
+def section_vo2max():
+    st.subheader("Distribution de la VO2max")
+    if "vo2max" in df_filtered.columns and not df_filtered["vo2max"].dropna().empty:
 
-if "age" in df_filtered.columns and "luc léger" in df_filtered.columns:
-    df_age_luc = df_filtered[["age", "luc léger"]].dropna()
-    if not df_age_luc.empty:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.regplot(
-            data=df_age_luc,
-            x="age",
-            y="luc léger",
-            scatter_kws={"alpha": 0.5},
-            line_kws={"color": "red"},
-        )
-        ax.set_title("Relation entre l'âge et le palier Luc Léger")
-        ax.set_xlabel("Âge")
-        ax.set_ylabel("Palier Luc Léger")
-        st.pyplot(fig)
+        def histogramme_vo2max():
+            fig, ax = new_figure(figsize=(10, 6))
+            plot_histogram_density(
+                ax,
+                distribution(version, empreinte_filtres, "vo2max", df_filtered),
+                color="purple",
+            )
+            ax.set_title("Distribution de la VO2max")
+            ax.set_xlabel("VO2max (ml/kg/min)")
+            ax.set_ylabel("Nombre d'individus")
+            return fig
+
+        show_chart("vo2max", histogramme_vo2max, version, empreinte_filtres)
+
+    st.subheader("Nuage de points : VO2max en fonction de l'âge")
+
+    if "vo2max" in df_filtered.columns and "age" in df_filtered.columns:
+        df_vo2_age = df_filtered[["vo2max", "age"]].dropna()
+
+        if not df_vo2_age.empty:
+
+            def nuage_vo2max_age():
+                fig, ax = new_figure(figsize=(10, 6))
+                sns.scatterplot(data=df_vo2_age, x="age", y="vo2max", alpha=0.6, ax=ax)
+                sns.regplot(
+                    data=df_vo2_age,
+                    x="age",
+                    y="vo2max",
+                    scatter=False,
+                    color="red",
+                    label="Tendance",
+                    ax=ax,
+                )
+                ax.set_title("Relation entre l'âge et la VO2max")
+                ax.set_xlabel("Âge (ans)")
+                ax.set_ylabel("VO2max (ml/kg/min)")
+                ax.legend()
+                return fig
+
+            show_chart("vo2max_age", nuage_vo2max_age, version, empreinte_filtres)
+        else:
+            st.info("Aucune donnée VO2max et âge disponible pour l'affichage.")
     else:
-        st.info("Pas de données disponibles pour l'âge ou le palier Luc Léger.")
+        st.warning("Les colonnes nécessaires 'vo2max' et 'age' sont manquantes.")
+
+    st.subheader("Relation entre l'âge et la VO2max (Formule de Léger 1988)")
+
+    if "vo2max_leger" in df_filtered.columns and "age" in df_filtered.columns:
+        df_vo2_leger_age = df_filtered[["vo2max_leger", "age"]].dropna()
+
+        if not df_vo2_leger_age.empty:
+
+            def nuage_vo2max_leger_age():
+                fig, ax = new_figure(figsize=(10, 6))
+                sns.scatterplot(
+                    data=df_vo2_leger_age, x="age", y="vo2max_leger", alpha=0.6, ax=ax
+                )
+                sns.regplot(
+                    data=df_vo2_leger_age,
+                    x="age",
+                    y="vo2max_leger",
+                    scatter=False,
+                    color="green",
+                    label="Tendance",
+                    ax=ax,
+                )
+                ax.set_title("Relation entre l'âge et la VO2max (Formule Léger 1988)")
+                ax.set_xlabel("Âge (ans)")
+                ax.set_ylabel("VO2max (ml/kg/min)")
+                ax.legend()
+                return fig
+
+            show_chart(
+                "vo2max_leger_age", nuage_vo2max_leger_age, version, empreinte_filtres
+            )
+        else:
+            st.info("Aucune donnée disponible pour VO2max (Léger) et âge.")
+    else:
+        st.warning("Les colonnes 'vo2max_leger' et 'age' sont manquantes.")
+    st.subheader("Distribution de la VO2max - Formule de Léger (1988)")
+
+    if (
+        "vo2max_leger" in df_filtered.columns
+        and not df_filtered["vo2max_leger"].dropna().empty
+    ):
+
+        def histogramme_vo2max_leger():
+            fig, ax = new_figure(figsize=(10, 6))
+            plot_histogram_density(
+                ax,
+                distribution(version, empreinte_filtres, "vo2max_leger", df_filtered),
+                color="teal",
+            )
+            ax.set_title("Distribution de la VO2max (Formule Léger 1988)")
+            ax.set_xlabel("VO2max Léger (ml/kg/min)")
+            ax.set_ylabel("Nombre d'individus")
+            return fig
 
-st.subheader("Distribution de la Tension Artérielle (Systolique & Diastolique)")
+        show_chart("vo2max_leger", histogramme_vo2max_leger, version, empreinte_filtres)
+    else:
+        st.info("Aucune donnée VO2max (formule Léger) disponible pour l'affichage.")
 
-if (
-    "tension artérielle systol" in df_filtered.columns
-    and "tension artérielle diastol" in df_filtered.columns
-):
-    df_tension = df_filtered[
-        ["tension artérielle systol", "tension artérielle diastol"]
-    ].dropna()
 
-    # Création des catégories selon les seuils OMS
-    df_tension["sys_couleur"] = df_tension["tension artérielle systol"].apply(
-        lambda x: "red" if x > 140 else "green"
-    )
-    df_tension["dia_couleur"] = df_tension["tension artérielle diastol"].apply(
-        lambda x: "red" if x > 90 else "green"
-    )
+def section_mensurations():
+    features = [
+        "imc",
+        "taille",
+        "poids",
+    ]
 
-    # Histogramme tension systolique
-    fig, ax = plt.subplots(figsize=(10, 6))
-    for couleur in ["green", "red"]:
-        subset = df_tension[df_tension["sys_couleur"] == couleur]
-        if not subset.empty:
-            ax.hist(
-                subset["tension artérielle systol"],
+    def histogramme(feature):
+        fig, ax = new_figure()
+        plot_histogram_density(
+            ax,
+            distribution(version, empreinte_filtres, feature, df_filtered),
+        )
+        ax.set_title(f"Histogramme de {feature.upper()}")
+        ax.set_xlabel(feature)
+        ax.set_ylabel("Nombre d'individus")
+        return fig
+
+    for feature in features:
+        st.subheader(f"Distribution de {feature.upper()}")
+        if feature in df_filtered.columns and not df_filtered[feature].dropna().empty:
+            show_chart(
+                f"histogramme_{feature}",
+                lambda: histogramme(feature),
+                version,
+                empreinte_filtres,
+            )
+        else:
+            st.info(f"Aucune donnée disponible pour {feature.upper()}.")
+
+
+def section_tests_physiques():
+    def boxplot_par_cie(test):
+        fig, ax = new_figure(figsize=(10, 6))
+        sns.boxplot(
+            x="cie",
+            y=test,
+            data=df_filtered,
+            order=observed_categories(df_filtered["cie"]),
+            ax=ax,
+            palette="Set2",
+        )
+        ax.set_xticklabels(ax.get_xticklabels(), rotation=45)
+        return fig
+
+    phys_tests = ["luc léger", "pompes", "tractions"]
+    for test in phys_tests:
+        st.subheader(f"{test.replace('_', ' ').title()} par Cie")
+        if not df_filtered.empty and test in df_filtered.columns:
+            show_chart(
+                f"boxplot_cie_{test}",
+                lambda: boxplot_par_cie(test),
+                version,
+                empreinte_filtres,
+            )
+        else:
+            st.info(f"Aucune donnée disponible pour {test}.")
+
+    st.subheader("Relation entre l'âge et le palier Luc Léger")
+
+    if "age" in df_filtered.columns and "luc léger" in df_filtered.columns:
+        df_age_luc = df_filtered[["age", "luc léger"]].dropna()
+        if not df_age_luc.empty:
+
+            def regression_age_luc_leger():
+                fig, ax = new_figure(figsize=(10, 6))
+                sns.regplot(
+                    data=df_age_luc,
+                    x="age",
+                    y="luc léger",
+                    scatter_kws={"alpha": 0.5},
+                    line_kws={"color": "red"},
+                    ax=ax,
+                )
+                ax.set_title("Relation entre l'âge et le palier Luc Léger")
+                ax.set_xlabel("Âge")
+                ax.set_ylabel("Palier Luc Léger")
+                return fig
+
+            show_chart(
+                "age_luc_leger", regression_age_luc_leger, version, empreinte_filtres
+            )
+        else:
+            st.info("Pas de données disponibles pour l'âge ou le palier Luc Léger.")
+
+
+def section_tension():
+    st.subheader("Distribution de la Tension Artérielle (Systolique & Diastolique)")
+
+    if (
+        "tension artérielle systol" in df_filtered.columns
+        and "tension artérielle diastol" in df_filtered.columns
+    ):
+
+        def histogramme_tension(col, seuil, libelle):
+            tension = df_filtered[
+                ["tension artérielle systol", "tension artérielle diastol"]
+            ].dropna()[col]
+
+            # Catégories selon les seuils OMS
+            couleurs = np.where(tension > seuil, "red", "green")
+
+            fig, ax = new_figure(figsize=(10, 6))
+            for couleur in ["green", "red"]:
+                subset = tension[couleurs == couleur]
+                if not subset.empty:
+                    ax.hist(
+                        subset,
+                        bins=15,
+                        alpha=0.7,
+                        label=f"{libelle} ({couleur})",
+                        color=couleur,
+                        edgecolor="black",
+                    )
+            ax.set_title(f"Distribution de la Tension Artérielle {libelle}")
+            ax.set_xlabel(f"Tension {libelle} (mmHg)")
+            ax.set_ylabel("Nombre d'individus")
+            ax.legend(title=f"État ({seuil} mmHg seuil)")
+            return fig
+
+        # Histogramme tension systolique
+        show_chart(
+            "tension_systolique",
+            lambda: histogramme_tension("tension artérielle systol", 140, "Systolique"),
+            version,
+            empreinte_filtres,
+        )
+
+        # Histogramme tension diastolique
+        show_chart(
+            "tension_diastolique",
+            lambda: histogramme_tension(
+                "tension artérielle diastol", 90, "Diastolique"
+            ),
+            version,
+            empreinte_filtres,
+        )
+
+    else:
+        st.warning("Les colonnes de tension artérielle sont manquantes ou incomplètes.")
+
+
+def section_aptitude_incendie():
+    st.subheader("luc léger selon l'Aptitude Générale et l'Exposition Incendie")
+
+    # Histogramme luc léger par Incendie et port de l'ARI, coloré par aptitude
+    if (
+        "luc léger" in df_filtered.columns
+        and "aptitude générale" in df_filtered.columns
+        and "incendie et port de l'ari toutes missions" in df_filtered.columns
+    ):
+
+        def histogramme_luc_leger_aptitude():
+            fig, ax = new_figure(figsize=(10, 6))
+            sns.histplot(
+                df_filtered,
+                x="luc léger",
+                hue="aptitude générale",
+                hue_order=observed_categories(df_filtered["aptitude générale"]),
+                multiple="stack",
                 bins=15,
-                alpha=0.7,
-                label=f"Systolique ({couleur})",
-                color=couleur,
-                edgecolor="black",
+                palette="Set2",
+                kde=False,
+                ax=ax,
             )
-    ax.set_title("Distribution de la Tension Artérielle Systolique")
-    ax.set_xlabel("Tension Systolique (mmHg)")
-    ax.set_ylabel("Nombre d'individus")
-    ax.legend(title="État (140 mmHg seuil)")
-    st.pyplot(fig)
-
-    # Histogramme tension diastolique
-    fig, ax = plt.subplots(figsize=(10, 6))
-    for couleur in ["green", "red"]:
-        subset = df_tension[df_tension["dia_couleur"] == couleur]
-        if not subset.empty:
-            ax.hist(
-                subset["tension artérielle diastol"],
+            ax.set_title("Répartition du palier luc léger selon l'aptitude générale")
+            ax.set_xlabel("Palier luc léger")
+            ax.set_ylabel("Nombre d'individus")
+            return fig
+
+        show_chart(
+            "luc_leger_aptitude",
+            histogramme_luc_leger_aptitude,
+            version,
+            empreinte_filtres,
+        )
+
+        def histogramme_luc_leger_incendie():
+            fig, ax = new_figure(figsize=(10, 6))
+            sns.histplot(
+                df_filtered,
+                x="luc léger",
+                hue="incendie et port de l'ari toutes missions",
+                hue_order=observed_categories(
+                    df_filtered["incendie et port de l'ari toutes missions"]
+                ),
+                multiple="stack",
                 bins=15,
-                alpha=0.7,
-                label=f"Diastolique ({couleur})",
-                color=couleur,
-                edgecolor="black",
+                palette="Set2",
+                kde=False,
+                ax=ax,
             )
-    ax.set_title("Distribution de la Tension Artérielle Diastolique")
-    ax.set_xlabel("Tension Diastolique (mmHg)")
-    ax.set_ylabel("Nombre d'individus")
-    ax.legend(title="État (90 mmHg seuil)")
-    st.pyplot(fig)
-
-else:
-    st.warning("Les colonnes de tension artérielle sont manquantes ou incomplètes.")
-
-st.subheader("luc léger selon l'Aptitude Générale et l'Exposition Incendie")
-
-# Histogramme luc léger par Incendie et port de l'ARI, coloré par aptitude
-if (
-    "luc léger" in df_filtered.columns
-    and "aptitude générale" in df_filtered.columns
-    and "incendie et port de l'ari toutes missions" in df_filtered.columns
-):
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.histplot(
-        df_filtered,
-        x="luc léger",
-        hue="aptitude générale",
-        multiple="stack",
-        bins=15,
-        palette="Set2",
-        kde=False,
-    )
-    ax.set_title("Répartition du palier luc léger selon l'aptitude générale")
-    ax.set_xlabel("Palier luc léger")
-    ax.set_ylabel("Nombre d'individus")
-    st.pyplot(fig)
-
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.histplot(
-        df_filtered,
-        x="luc léger",
-        hue="incendie et port de l'ari toutes missions",
-        multiple="stack",
-        bins=15,
-        palette="Set2",
-        kde=False,
-    )
-    ax.set_title(
-        "Répartition du palier luc léger selon Incendie et port de l'ARI Toutes missions"
+            ax.set_title(
+                "Répartition du palier luc léger selon Incendie et port de l'ARI Toutes missions"
+            )
+            ax.set_xlabel("Palier luc léger")
+            ax.set_ylabel("Nombre d'individus")
+            return fig
+
+        show_chart(
+            "luc_leger_incendie",
+            histogramme_luc_leger_incendie,
+            version,
+            empreinte_filtres,
+        )
+
+    # Boxplot luc léger par aptitude et Incendie/ARI
+    def boxplot_aptitude_incendie():
+        fig, ax = new_figure(figsize=(12, 6))
+        sns.boxplot(
+            data=df_filtered,
+            x="aptitude générale",
+            y="luc léger",
+            hue="incendie et port de l'ari toutes missions",
+            order=observed_categories(df_filtered["aptitude générale"]),
+            hue_order=observed_categories(
+                df_filtered["incendie et port de l'ari toutes missions"]
+            ),
+            palette="pastel",
+            ax=ax,
+        )
+        ax.set_title("luc léger par Aptitude Générale et Incendie/ARI")
+        ax.set_ylabel("Palier luc léger")
+        ax.set_xlabel("Aptitude Générale")
+        ax.tick_params(axis="x", rotation=45)
+        return fig
+
+    show_chart(
+        "boxplot_aptitude_incendie",
+        boxplot_aptitude_incendie,
+        version,
+        empreinte_filtres,
     )
-    ax.set_xlabel("Palier luc léger")
-    ax.set_ylabel("Nombre d'individus")
-    st.pyplot(fig)
-
-
-# Boxplot luc léger par aptitude et Incendie/ARI
-fig, ax = plt.subplots(figsize=(12, 6))
-sns.boxplot(
-    data=df_filtered,
-    x="aptitude générale",
-    y="luc léger",
-    hue="incendie et port de l'ari toutes missions",
-    palette="pastel",
-)
-ax.set_title("luc léger par Aptitude Générale et Incendie/ARI")
-ax.set_ylabel("Palier luc léger")
-ax.set_xlabel("Aptitude Générale")
-ax.tick_params(axis="x", rotation=45)
-st.pyplot(fig)
 
 
-st.subheader("🔗 Corrélations avec le Palier luc léger")
+def section_correlations():
+    st.subheader("🔗 Corrélations avec le Palier luc léger")
 
-# Sélection des colonnes numériques pertinentes
-cols_corr = [
-    "luc léger",
-    "imc",
-    "poids",
-    "taille",
-    "tension artérielle systol",
-    "tension artérielle diastol",
-    "pompes",
-    "tractions",
-    "niveau luc léger",
-    "niveau pompes",
-    "niveau tractions",
-    "périmètre abdominal",
-]
+    # Sélection des colonnes numériques pertinentes
+    cols_corr = [
+        "luc léger",
+        "imc",
+        "poids",
+        "taille",
+        "tension artérielle systol",
+        "tension artérielle diastol",
+        "pompes",
+        "tractions",
+        "niveau luc léger",
+        "niveau pompes",
+        "niveau tractions",
+        "périmètre abdominal",
+    ]
 
-# Filtrage des colonnes existantes dans le dataframe filtré
-cols_corr = [col for col in cols_corr if col in df_filtered.columns]
-df_corr = df_filtered[cols_corr].dropna()
-
-# Calcul de la matrice de corrélation
-corr_matrix = df_corr.corr()
-
-# Affichage d'une heatmap
-fig, ax = plt.subplots(figsize=(10, 8))
-sns.heatmap(
-    corr_matrix,
-    annot=True,
-    cmap="coolwarm",
-    fmt=".2f",
-    linewidths=0.5,
-    square=True,
-    cbar_kws={"shrink": 0.8},
-)
-ax.set_title("Matrice de Corrélation - Indicateurs Physiques et luc léger")
-st.pyplot(fig)
+    # Filtrage des colonnes existantes dans le dataframe filtré
+    cols_corr = [col for col in cols_corr if col in df_filtered.columns]
+
+    def heatmap_correlations():
+        # Calcul de la matrice de corrélation
+        corr_matrix = df_filtered[cols_corr].dropna().corr()
+
+        # Affichage d'une heatmap
+        fig, ax = new_figure(figsize=(10, 8))
+        sns.heatmap(
+            corr_matrix,
+            annot=True,
+            cmap="coolwarm",
+            fmt=".2f",
+            linewidths=0.5,
+            square=True,
+            cbar_kws={"shrink": 0.8},
+            ax=ax,
+        )
+        ax.set_title("Matrice de Corrélation - Indicateurs Physiques et luc léger")
+        return fig
 
-st.subheader("🎯 Répartition des niveaux ICP - SPP (Filtres appliqués)")
+    show_chart("correlations", heatmap_correlations, version, empreinte_filtres)
 
-for group_col in ["cie", "ut", "sexe", "tranche_age"]:
-    if group_col in df_filtered.columns:
-        st.markdown(f"#### Répartition par {group_col}")
-        tab = (
-            df_filtered.groupby([group_col, "couleur_globale"])
-            .size()
-            .unstack(fill_value=0)
-        )
-        tab["Total"] = tab.sum(axis=1)
-        for color in ["Vert", "Orange", "Rouge"]:
-            if color in tab.columns:
-                tab[f"% {color}"] = round(100 * tab[color] / tab["Total"], 1)
-        st.dataframe(tab)
 
-st.subheader("Carte Interactive des UT")
+# Tableaux ICP mis en cache par état de filtres
+@st.cache_data(max_entries=64)
+def icp_tables(version, empreinte, _df_filtered, _filtres):
+    # Sans filtre actif hors dimensions du cube, les tableaux sont lus dans le
+    # cube au lieu de regrouper les lignes filtrées
+    cube = icp_cube(df, version)
+    selections = cube_selections(df, _filtres, indexes, cube)
 
+    tables = {}
+    for group_col in ["cie", "ut", "sexe", "tranche_age"]:
+        if group_col in _df_filtered.columns:
+            if selections is not None:
+                tables[group_col] = add_icp_percentages(
+                    cube_table(cube, selections, group_col, "couleur_globale")
+                )
+            else:
+                tables[group_col] = icp_table(_df_filtered, group_col)
+    return tables
 
-@st.cache_data
-def load_geojson():
-    geo_path = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "alsace_map.geojson")
-    )
-    with open(geo_path, "r", encoding="utf-8") as f:
-        return json.load(f)
 
+def section_icp():
+    st.subheader("🎯 Répartition des niveaux ICP - SPP (Filtres appliqués)")
+
+    tables = icp_tables(version, empreinte_filtres, df_filtered, filtres)
+    for group_col, tab in tables.items():
+        st.markdown(f"#### Répartition par {group_col}")
+        st.dataframe(tab)
 
-try:
-    geojson_data = load_geojson()
 
+# IMC moyen et effectif par UT, mis en cache par état de filtres
+@st.cache_data(max_entries=64)
+def stats_par_ut(version, empreinte, _df_filtered):
     # Nettoyage des noms d’UT
     ut_mapping = {
         "UT STRASBOURG OUEST": "STRASBOURG-3",
@@ -944,111 +1021,143 @@ try:
         "UT WOERTH": "WISSEMBOURG",
     }
 
-    df_filtered["UT_clean"] = (
-        df_filtered["ut"]
+    # Série locale : les données filtrées partagent la table de base
+    ut_clean = (
+        _df_filtered["ut"]
         .astype(str)
         .str.strip()
         .str.upper()
         .replace({k.upper(): v for k, v in ut_mapping.items()})
+        .rename("UT_clean")
     )
 
     # Moyenne d'IMC par UT
-    imc_moyen = df_filtered.groupby("UT_clean")["imc"].mean().reset_index()
+    imc_moyen = _df_filtered.groupby(ut_clean)["imc"].mean().reset_index()
     imc_moyen.columns = ["nom", "imc_moyen"]
 
     # Effectif par UT
-    effectif_ut = df_filtered["UT_clean"].value_counts().reset_index()
+    effectif_ut = ut_clean.value_counts().reset_index()
     effectif_ut.columns = ["nom", "effectif"]
+    return imc_moyen, effectif_ut
 
-    # Construction des features géographiques
-    geo_features = [
-        {**f["properties"], "geometry": f["geometry"]} for f in geojson_data["features"]
-    ]
-    geo_df = pd.DataFrame(geo_features)
-    geo_df["nom"] = geo_df["nom"].str.strip().str.upper()
 
-    # Fusion avec données
-    geo_df = geo_df.merge(effectif_ut, on="nom", how="left")
-    geo_df = geo_df.merge(imc_moyen, on="nom", how="left")
-    geo_df.fillna({"effectif": 0, "imc_moyen": 0}, inplace=True)
+def section_carte():
+    st.subheader("Carte Interactive des UT")
 
-    # Carte
-    m = folium.Map(location=[48.6, 7.6], zoom_start=9, control_scale=True)
+    try:
+        geojson_data = load_geojson()
 
-    colormap = cm.linear.YlOrRd_09.scale(
-        geo_df["imc_moyen"].min(), geo_df["imc_moyen"].max()
-    )
-    colormap.caption = "IMC moyen"
-    colormap.add_to(m)
-
-    folium.Choropleth(
-        geo_data=geojson_data,
-        data=geo_df,
-        columns=["nom", "imc_moyen"],
-        key_on="feature.properties.nom",
-        fill_color="YlOrRd",
-        fill_opacity=0.6,
-        line_opacity=0.5,
-        line_color="black",
-        legend_name="IMC moyen par UT",
-        highlight=True,
-    ).add_to(m)
-
-    for _, row in geo_df.iterrows():
-        if row["effectif"] > 0:
-            geom = row["geometry"]
-            coords = (
-                geom["coordinates"][0]
-                if geom["type"] == "Polygon"
-                else geom["coordinates"][0][0]
-            )
-            lon = sum(pt[0] for pt in coords) / len(coords)
-            lat = sum(pt[1] for pt in coords) / len(coords)
+        imc_moyen, effectif_ut = stats_par_ut(version, empreinte_filtres, df_filtered)
 
-            tooltip_text = f"""
-<b>UT : {row['nom']}</b><br>
-Effectif : {int(row['effectif'])}<br>
-IMC moyen : {row['imc_moyen']:.2f}
-"""
-            folium.CircleMarker(
-                location=(lat, lon),
-                radius=7,
-                color=colormap(row["imc_moyen"]),
-                fill=True,
-                fill_color=colormap(row["imc_moyen"]),
-                fill_opacity=0.9,
-            ).add_to(m)
-            lat_offset = lat + 0.01  # décalage vers le nord
-            lon_offset = lon + 0.01
-            folium.map.Marker(
-                [lat_offset, lon_offset],
-                icon=folium.DivIcon(
-                    html=f"""
-                    <div style="
-                        font-size: 11px;
-                        color: white;
-                        background-color: rgba(0, 0, 0, 0.6);
-                        padding: 2px 6px;
-                        border-radius: 4px;
-                        font-weight: bold;
-                        text-align: center;
-                        white-space: nowrap;
-                        box-shadow: 1px 1px 2px rgba(0,0,0,0.5);">
-                        {row['nom']}<br>
-                        Effectif: {int(row['effectif'])}<br>
-                        IMC: {row['imc_moyen']:.1f}
-                    </div>
-                    """
-                ),
-            ).add_to(m)
+        # Construction des features géographiques
+        geo_features = [
+            {**f["properties"], "geometry": f["geometry"]}
+            for f in geojson_data["features"]
+        ]
+        geo_df = pd.DataFrame(geo_features)
+        geo_df["nom"] = geo_df["nom"].str.strip().str.upper()
 
-    MiniMap(toggle_display=True).add_to(m)
-    folium.LayerControl().add_to(m)
-    st_folium(m, use_container_width=True, height=700)
+        # Fusion avec données
+        geo_df = geo_df.merge(effectif_ut, on="nom", how="left")
+        geo_df = geo_df.merge(imc_moyen, on="nom", how="left")
+        geo_df.fillna({"effectif": 0, "imc_moyen": 0}, inplace=True)
 
-except Exception as e:
-    st.error(f"Erreur de chargement de la carte : {e}")
+        # Carte
+        m = folium.Map(location=[48.6, 7.6], zoom_start=9, control_scale=True)
 
+        colormap = cm.linear.YlOrRd_09.scale(
+            geo_df["imc_moyen"].min(), geo_df["imc_moyen"].max()
+        )
+        colormap.caption = "IMC moyen"
+        colormap.add_to(m)
+
+        folium.Choropleth(
+            geo_data=geojson_data,
+            data=geo_df,
+            columns=["nom", "imc_moyen"],
+            key_on="feature.properties.nom",
+            fill_color="YlOrRd",
+            fill_opacity=0.6,
+            line_opacity=0.5,
+            line_color="black",
+            legend_name="IMC moyen par UT",
+            highlight=True,
+        ).add_to(m)
+
+        for _, row in geo_df.iterrows():
+            if row["effectif"] > 0:
+                geom = row["geometry"]
+                coords = (
+                    geom["coordinates"][0]
+                    if geom["type"] == "Polygon"
+                    else geom["coordinates"][0][0]
+                )
+                lon = sum(pt[0] for pt in coords) / len(coords)
+                lat = sum(pt[1] for pt in coords) / len(coords)
+
+                tooltip_text = f"""
+    <b>UT : {row['nom']}</b><br>
+    Effectif : {int(row['effectif'])}<br>
+    IMC moyen : {row['imc_moyen']:.2f}
+    """
+                folium.CircleMarker(
+                    location=(lat, lon),
+                    radius=7,
+                    color=colormap(row["imc_moyen"]),
+                    fill=True,
+                    fill_color=colormap(row["imc_moyen"]),
+                    fill_opacity=0.9,
+                ).add_to(m)
+                lat_offset = lat + 0.01  # décalage vers le nord
+                lon_offset = lon + 0.01
+                folium.map.Marker(
+                    [lat_offset, lon_offset],
+                    icon=folium.DivIcon(
+                        html=f"""
+                        <div style="
+                            font-size: 11px;
+                            color: white;
+                            background-color: rgba(0, 0, 0, 0.6);
+                            padding: 2px 6px;
+                            border-radius: 4px;
+                            font-weight: bold;
+                            text-align: center;
+                            white-space: nowrap;
+                            box-shadow: 1px 1px 2px rgba(0,0,0,0.5);">
+                            {row['nom']}<br>
+                            Effectif: {int(row['effectif'])}<br>
+                            IMC: {row['imc_moyen']:.1f}
+                        </div>
+                        """
+                    ),
+                ).add_to(m)
+
+        MiniMap(toggle_display=True).add_to(m)
+        folium.LayerControl().add_to(m)
+        st_folium(m, use_container_width=True, height=700)
+
+    except Exception as e:
+        st.error(f"Erreur de chargement de la carte : {e}")
+
+
+# Sections calculées à la demande : seule la section choisie est calculée et
+# affichée (ses graphiques restent en cache tant que les filtres ne changent pas)
+SECTIONS = {
+    "IMC et Luc Léger": section_imc_luc_leger,
+    "Tour de taille": section_tour_de_taille,
+    "VO2max": section_vo2max,
+    "Mensurations": section_mensurations,
+    "Tests physiques": section_tests_physiques,
+    "Tension artérielle": section_tension,
+    "Aptitude et incendie": section_aptitude_incendie,
+    "Corrélations": section_correlations,
+    "Niveaux ICP": section_icp,
+    "Carte des UT": section_carte,
+}
+section = st.radio(
+    "Section affichée :", list(SECTIONS), horizontal=True, key="section_spp"
+)
+SECTIONS[section]()
 
 st.markdown(
     """
@@ -1061,11 +1170,27 @@ st.markdown(
 """
 )
 
+
+# Table complète (toutes les colonnes du snapshot), lue seulement à la
+# première demande d'export, pour la même version que la table de base
+@st.cache_resource(show_spinner="Préparation de l'export...", max_entries=1)
+def load_export_data(version):
+    return load_spp()
+
+
 if not df_filtered.empty:
-    csv = df_filtered.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        "📥 Télécharger les données filtrées (CSV)",
-        data=csv,
-        file_name="donnees_filtrees.csv",
-        mime="text/csv",
-    )
+    if st.button("📥 Préparer l'export des données filtrées (CSV)"):
+        # Lignes retenues par les filtres, avec toutes les colonnes du fichier
+        positions = df.index.get_indexer(df_filtered.index)
+        csv = (
+            load_export_data(version)
+            .take(positions)
+            .to_csv(index=False)
+            .encode("utf-8")
+        )
+        st.download_button(
+            "📥 Télécharger les données filtrées (CSV)",
+            data=csv,
+            file_name="donnees_filtrees.csv",
+            mime="text/csv",
+        )
@@ -1,166 +1,79 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import chardet
 import os
 import matplotlib.image as mpimg
 from PIL import Image
 import numpy as np
 
+from sdis.aggregates import (
+    accident_rate_by,
+    categorie_blessure,
+    count_by,
+    mean_duration_by,
+)
+from sdis.bitmaps import build_bitmap_indexes
+from sdis.cache import filter_cache
+from sdis.charts import new_figure, show_cache_stats, show_chart
+from sdis.filters import apply_filters, filter_key, isin
+from sdis.join import (
+    COLONNES_JOINTURE,
+    build_matricule_index,
+    join_fitness,
+    normalize_matricule,
+)
+from sdis.loaders import ACCIDENT_CSV, load_accident, load_spp, load_spv
+from sdis.snapshot import data_path, dataset_version, source_signature
+
 # Titre
 st.title("Analyse de l'accidentologie")
 
 
-# Fonction de chargement des données avec détection automatique de l'encodage
-def load_data():
-    data_path = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "accidentologie.csv")
-    )
-
-    # Détection de l'encodage
-    with open(data_path, "rb") as f:
-        result = chardet.detect(f.read())
-    encoding_detected = result["encoding"]
-
-    # Lecture du fichier avec l'encodage détecté et le séparateur correct
-    data = pd.read_csv(data_path, sep=";", encoding=encoding_detected)
-    return data
+# Colonnes utilisées par la page : seules celles-ci sont lues depuis le snapshot
+COLONNES = [
+    "Statut",
+    "Mat.",
+    "Age",
+    "Date de naissance",
+    "CIS",
+    "CIS normalisé",
+    "Date de l'accident",
+    "Année",
+    "Jour_semaine",
+    "Heure_accident",
+    "Nature de l'accident",
+    "Moment de l'accident",
+    "Type de sport",
+    "Date début initial",
+    "Date fin initial",
+    "Durée totale arrêt",
+    "Nature lésion",
+    "Siège lésion",
+    "Latéralité de la blessure",
+]
+
+# Dimensions filtrées par liste déroulante, résolues par index bitmap
+DIMENSIONS = ["Statut", "Année", "Nature de l'accident", "CIS normalisé"]
+
+
+# Chargement des données nettoyées, une seule fois par processus tant que le
+# fichier source ne change pas (l'encodage n'est détecté qu'à la conversion du
+# CSV). La table est partagée, sans copie, entre toutes les sessions : elle est
+# en lecture seule, les colonnes calculées par la page sont ajoutées aux
+# données filtrées (toujours un nouvel objet).
+@st.cache_resource(show_spinner="Chargement des accidents...", max_entries=1)
+def load_data(signature):
+    data = load_accident(columns=COLONNES)
+    # Index bitmap des dimensions à liste déroulante, construits une fois
+    return data, build_bitmap_indexes(data, DIMENSIONS)
 
 
 # Lecture des données
-data = load_data()
+data, indexes = load_data(source_signature(data_path(ACCIDENT_CSV)))
 
-# Nettoyage des données
-data.columns = data.columns.str.replace("*", "", regex=False).str.strip()
-data.drop(columns=["Agent"], inplace=True)
-data["Date de l'accident"] = pd.to_datetime(
-    data["Date de l'accident"], errors="coerce", dayfirst=True
-)
-data["Année"] = data["Date de l'accident"].dt.year
-data["Mois"] = data["Date de l'accident"].dt.month
-data["Jour"] = data["Date de l'accident"].dt.day
-data["Jour_semaine"] = data["Date de l'accident"].dt.day_name()
-data["Durée totale arrêt"] = pd.to_numeric(data["Durée totale arrêt"], errors="coerce")
-data["Heure_accident"] = pd.to_datetime(
-    data["Heure de l'accident"], errors="coerce"
-).dt.hour
 # Affichage du tableau
 st.subheader("Aperçu des données")
 st.dataframe(data.head())
 
-# -- Ajout de colonnes utiles pour les filtres --
-data["Date de l'accident"] = pd.to_datetime(
-    data["Date de l'accident"], errors="coerce", dayfirst=True
-)
-data["Année"] = data["Date de l'accident"].dt.year
-
-
-cis_compagnie_mapping = {
-    # Compagnie de Haguenau
-    "HAGUENAU": "Compagnie de Haguenau",
-    "BISCHWILLER": "Compagnie de Haguenau",
-    "BRUMATH": "Compagnie de Haguenau",
-    "DRUSENHEIM": "Compagnie de Haguenau",
-    "GAMBSHEIM": "Compagnie de Haguenau",
-    "GRIES": "Compagnie de Haguenau",
-    "HOCHFELDEN": "Compagnie de Haguenau",
-    "MERTZWILLER": "Compagnie de Haguenau",
-    "REICHSHOFFEN": "Compagnie de Haguenau",
-    "SOUFFLENHEIM": "Compagnie de Haguenau",
-    "VAL DE MODER": "Compagnie de Haguenau",
-    "WEITBRUCH": "Compagnie de Haguenau",
-    "WOERTH": "Compagnie de Haguenau",
-    "ROHRWILLER": "Compagnie de Haguenau",
-    "ROESCHWOOG": "Compagnie de Haguenau",
-    "OBERHOFFEN SUR MODER": "Compagnie de Haguenau",
-    "DURRENBACH": "Compagnie de Haguenau",
-    "BETSCHDORF": "Compagnie de Haguenau",
-    "RITTERSHOFFEN": "Compagnie de Haguenau",
-    "WEYERSHEIM": "Compagnie de Haguenau",
-    "HATTEN": "Compagnie de Haguenau",
-    "SALMBACH": "Compagnie de Haguenau",
-    "LOBSANN": "Compagnie de Haguenau",
-    "WINTERSHOUSE": "Compagnie de Haguenau",
-    "DURRENBACH-WALBOURG": "Compagnie de Haguenau",
-    # Compagnie de Saverne
-    "SAVERNE": "Compagnie de Saverne",
-    "DRULINGEN": "Compagnie de Saverne",
-    "INGWILLER": "Compagnie de Saverne",
-    "DOSSENHEIM S/ZINSEL": "Compagnie de Saverne",
-    "MONSWILLER": "Compagnie de Saverne",
-    "WIMMENAU": "Compagnie de Saverne",
-    "RAUWILLER": "Compagnie de Saverne",
-    "VOLKSBERG": "Compagnie de Saverne",
-    "PETERSBACH": "Compagnie de Saverne",
-    "WEISLINGEN": "Compagnie de Saverne",
-    "NIEDERBRONN LES BAIN": "Compagnie de Saverne",
-    "WINGEN SUR MODER": "Compagnie de Saverne",
-    # Compagnie de Molsheim
-    "MOLSHEIM": "Compagnie de Molsheim",
-    "MUTZIG": "Compagnie de Molsheim",
-    "WASSELONNE": "Compagnie de Molsheim",
-    "ROSHEIM": "Compagnie de Molsheim",
-    "WESTHOFFEN": "Compagnie de Molsheim",
-    "BERGBIETEN": "Compagnie de Molsheim",
-    "BARR": "Compagnie de Molsheim",
-    "ERNOLSHEIM S.BRUCHE": "Compagnie de Molsheim",
-    "STILL": "Compagnie de Molsheim",
-    "WOLFISHEIM": "Compagnie de Molsheim",
-    "ERGERSHEIM": "Compagnie de Molsheim",
-    "ALTECKENDORF": "Compagnie de Molsheim",
-    "SCHNERSHEIM": "Compagnie de Molsheim",
-    "BOERSCH": "Compagnie de Molsheim",
-    # Compagnie de Sélestat
-    "SELESTAT": "Compagnie de Sélestat",
-    "MUSSIG": "Compagnie de Sélestat",
-    "BALDENHEIM": "Compagnie de Sélestat",
-    "EBERSHEIM": "Compagnie de Sélestat",
-    "EBERSMUNSTER": "Compagnie de Sélestat",
-    "MUTTERSHOLTZ": "Compagnie de Sélestat",
-    "MARCKOLSHEIM": "Compagnie de Sélestat",
-    "SUNDHOUSE": "Compagnie de Sélestat",
-    "RHINAU": "Compagnie de Sélestat",
-    "HILSENHEIM": "Compagnie de Sélestat",
-    "OHNENHEIM": "Compagnie de Sélestat",
-    "DAMBACH-LA-VILLE": "Compagnie de Sélestat",
-    "BINDERNHEIM": "Compagnie de Sélestat",
-    # Compagnie de l'EMS Nord
-    "STRASBOURG NORD": "Compagnie de l'EMS Nord",
-    "BISCHHEIM": "Compagnie de l'EMS Nord",
-    "HOENHEIM": "Compagnie de l'EMS Nord",
-    "MITTELHAUSBERGEN": "Compagnie de l'EMS Nord",
-    "MUNDOLSHEIM": "Compagnie de l'EMS Nord",
-    "GRIESHEIM-SUR-SOUFFE": "Compagnie de l'EMS Nord",
-    "TRUCHTERSHEIM": "Compagnie de l'EMS Nord",
-    "LA SOUFFEL": "Compagnie de l'EMS Nord",
-    # Compagnie de l'EMS Centre
-    "STRASBOURG OUEST": "Compagnie de l'EMS Centre",
-    "STRASBOURG FINK": "Compagnie de l'EMS Centre",
-    "OSTWALD": "Compagnie de l'EMS Centre",
-    "LINGOLSHEIM": "Compagnie de l'EMS Centre",
-    "ILLKIRCH-GRAFFENSTAD": "Compagnie de l'EMS Centre",
-    "VILLE": "Compagnie de l'EMS Centre",
-    "FINKWILLER": "Compagnie de l'EMS Centre",
-    # Compagnie de l'EMS Sud
-    "STRASBOURG SUD": "Compagnie de l'EMS Sud",
-    "FEGERSHEIM": "Compagnie de l'EMS Sud",
-    "LIPSHEIM": "Compagnie de l'EMS Sud",
-    "NORDHOUSE": "Compagnie de l'EMS Sud",
-    "GEISPOLSHEIM": "Compagnie de l'EMS Sud",
-    "FEGERSHEIM-ESCHAU": "Compagnie de l'EMS Sud",
-    # Cas spéciaux ou libellés centralisés
-    "CIE HAGUENAU": "Compagnie de Haguenau",
-    "CIE SAVERNE": "Compagnie de Saverne",
-    "CIE MOLSHEIM": "Compagnie de Molsheim",
-    "CIE SELESTAT": "Compagnie de Sélestat",
-    "CIE EMS NORD": "Compagnie de l'EMS Nord",
-    "CIE EMS CENTRE": "Compagnie de l'EMS Centre",
-    "CIE EMS SUD": "Compagnie de l'EMS Sud",
-}
-# Appliquer le mapping CIS > compagnie
-data["CIS"] = data["CIS"].astype(str).str.strip().str.upper()
-data["CIS normalisé"] = data["CIS"].map(cis_compagnie_mapping)
-
 # -- Filtres Streamlit --
 st.sidebar.header("Filtres")
 
@@ -188,114 +101,104 @@ compagnies = st.sidebar.multiselect(
     default=None,
 )
 
-# Appliquer les filtres
-if statuts:
-    data = data[data["Statut"].isin(statuts)]
-if annees:
-    data = data[data["Année"].isin(annees)]
-if natures:
-    data = data[data["Nature de l'accident"].isin(natures)]
-if compagnies:
-    data = data[data["CIS normalisé"].isin(compagnies)]
+# Appliquer les filtres (OU des bitmaps par dimension, puis ET entre elles)
+filtres = [
+    isin("Statut", statuts),
+    isin("Année", annees),
+    isin("Nature de l'accident", natures),
+    isin("CIS normalisé", compagnies),
+]
+version = dataset_version(data)
+data = apply_filters(
+    data,
+    filtres,
+    indexes,
+    cache=filter_cache(),
+    version=version,
+    state=st.session_state.setdefault("masques_accident", {}),
+)
 
-# --- Classification des types de blessures ---
-# Dictionnaire de mapping vers catégories principales
-mapping_categories = {
-    "FRACTURE": "Osseuse",
-    "CONTUSION, HEMATOME": "Osseuse",
-    "ATTEINTE OSTEO-ARTICULAIRE ET/OU MUSCULAIRE (ENTORSE, DOULEURS D'EFFORT, ETC.)": "Ligamentaire",
-    "DECHIRURE MUSCULAIRE": "Musculaire",
-    "LUXATION": "Ligamentaire",
-    "DOULEURS,LUMBAGO": "Musculaire",
-    "HERNIE": "Musculaire",
-    "CHOC TRAUMATIQUE": "Osseuse",
-    "LESIONS INTERNES": "Osseuse",
-    "PLAIE": "Tendineuse",
-    "MORSURE": "Tendineuse",
-    "PIQURE": "Autres",
-    "BRULURE PHYSIQUE, CHIMIQUE": "Autres",
-    "PRESENCE DE CORPS ETRANGERS": "Autres",
-    "ELECTRISATION, ELECTROCUTION": "Autres",
-    "COMMOTION, PERTE DE CONNAISSANCE, MALAISE": "Autres",
-    "INTOXICATION PAR INGESTION, PAR INHALATION, PAR VOIE PERCUTANEE": "Autres",
-    "AUTRE NATURE DE LESION": "Autres",
-    "LESION POTENTIELLEMENT INFECTIEUSE DUE AU PRODUIT BIOLOGIQUE": "Autres",
-    "TROUBLES VISUELS": "Autres",
-    "CHOCS CONSECUTIFS A AGRESSION,MENACE": "Autres",
-    "REACTION ALLERGIQUE OU INFLAMMATOIRE CUTANEE OU MUQUEUSE": "Autres",
-    "TROUBLES AUDITIFS": "Autres",
-    "DERMITE": "Autres",
-    "LESIONS NERVEUSES": "Autres",
-    "LESIONS DE NATURE MULTIPLE": "Autres",
-}
+show_cache_stats()
+
+# Les graphiques ne dépendent que des données filtrées : ils sont mis en cache
+# par (identifiant, version du jeu de données, empreinte des filtres)
+empreinte_filtres = filter_key(filtres)
 
-# Appliquer la classification
-data["Catégorie blessure"] = (
-    data["Nature lésion"].map(mapping_categories).fillna("Autres")
-)
+
+# --- Classification des types de blessures ---
+data["Catégorie blessure"] = categorie_blessure(data)
 
 # Graphique: accidents par année
 st.subheader("Nombre d'accidents par année")
-fig1, ax1 = plt.subplots()
-data["Année"].value_counts().sort_index().plot(kind="bar", ax=ax1)
-ax1.set_title("Nombre d'accidents par année")
-ax1.set_xlabel("Année")
-ax1.set_ylabel("Nombre d'accidents")
-ax1.grid(True)
-st.pyplot(fig1)
+
+
+def accidents_par_annee():
+    fig1, ax1 = new_figure()
+    count_by(data, "Année", ordered=True).plot(kind="bar", ax=ax1)
+    ax1.set_title("Nombre d'accidents par année")
+    ax1.set_xlabel("Année")
+    ax1.set_ylabel("Nombre d'accidents")
+    ax1.grid(True)
+    return fig1
+
+
+show_chart("par_annee", accidents_par_annee, version, empreinte_filtres)
 
 
 st.subheader("Nombre d'accidents par jour de la semaine")
-fig2, ax2 = plt.subplots()
-jours = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-data["Jour_semaine"] = pd.Categorical(
-    data["Jour_semaine"], categories=jours, ordered=True
-)
-data["Jour_semaine"].value_counts().sort_index().plot(kind="bar", ax=ax2)
-ax2.set_title("Accidents par jour de la semaine")
-ax2.set_xlabel("Jour")
-ax2.set_ylabel("Nombre d'accidents")
-ax2.grid(True)
-st.pyplot(fig2)
+
+
+def accidents_par_jour():
+    fig2, ax2 = new_figure()
+    # Jour_semaine est une catégorielle ordonnée du lundi au dimanche
+    count_by(data, "Jour_semaine", ordered=True).plot(kind="bar", ax=ax2)
+    ax2.set_title("Accidents par jour de la semaine")
+    ax2.set_xlabel("Jour")
+    ax2.set_ylabel("Nombre d'accidents")
+    ax2.grid(True)
+    return fig2
+
+
+show_chart("par_jour", accidents_par_jour, version, empreinte_filtres)
 
 
 st.subheader("Top 10 des natures d'accidents")
-fig3, ax3 = plt.subplots(figsize=(10, 6))
-data["Nature de l'accident"].value_counts().head(10).plot(kind="barh", ax=ax3)
-ax3.set_title("Top 10 des natures d'accidents")
-ax3.set_xlabel("Nombre")
-ax3.invert_yaxis()
-ax3.grid(True)
-fig3.tight_layout()
-st.pyplot(fig3)
+
+
+def top_natures():
+    fig3, ax3 = new_figure(figsize=(10, 6))
+    count_by(data, "Nature de l'accident").head(10).plot(kind="barh", ax=ax3)
+    ax3.set_title("Top 10 des natures d'accidents")
+    ax3.set_xlabel("Nombre")
+    ax3.invert_yaxis()
+    ax3.grid(True)
+    fig3.tight_layout()
+    return fig3
+
+
+show_chart("top_natures", top_natures, version, empreinte_filtres)
 
 
 st.subheader("Top 10 - Durée moyenne d'arrêt par nature de lésion")
-fig4, ax4 = plt.subplots(figsize=(10, 6))
-(
-    data.groupby("Nature lésion")["Durée totale arrêt"]
-    .mean()
-    .dropna()
-    .sort_values(ascending=False)
-    .head(10)
-    .plot(kind="barh", ax=ax4)
-)
-ax4.set_title("Top 10 - Durée moyenne d'arrêt par nature de lésion")
-ax4.set_xlabel("Durée moyenne (jours)")
-ax4.invert_yaxis()
-ax4.grid(True)
-fig4.tight_layout()
-st.pyplot(fig4)
 
 
-from datetime import datetime
+def top_durees():
+    fig4, ax4 = new_figure(figsize=(10, 6))
+    mean_duration_by(data, "Nature lésion").head(10).plot(kind="barh", ax=ax4)
+    ax4.set_title("Top 10 - Durée moyenne d'arrêt par nature de lésion")
+    ax4.set_xlabel("Durée moyenne (jours)")
+    ax4.invert_yaxis()
+    ax4.grid(True)
+    fig4.tight_layout()
+    return fig4
 
-# Conversion de la date de naissance
-data["Date de naissance"] = pd.to_datetime(
-    data["Date de naissance"], errors="coerce", dayfirst=True
-)
 
-# Calcul de l'âge en années
+show_chart("top_durees", top_durees, version, empreinte_filtres)
+
+
+from datetime import datetime
+
+# Calcul de l'âge en années (date de naissance parsée au chargement)
 aujourd_hui = pd.Timestamp("today")
 data["Age_calculé"] = ((aujourd_hui - data["Date de naissance"]).dt.days // 365).astype(
     "Int64"
@@ -303,29 +206,44 @@ data["Age_calculé"] = ((aujourd_hui - data["Date de naissance"]).dt.days // 365
 
 # --- Répartition par tranche d'âge ---
 st.subheader("Nombre d'accidents par tranche d'âge")
-age_distribution = data["Age_calculé"].value_counts().sort_index()
 
-fig5, ax5 = plt.subplots(figsize=(8, 5))
-age_distribution.plot(kind="bar", ax=ax5)
-ax5.set_title("Nombre d'accidents par tranche d'âge")
-ax5.set_xlabel("Âge")
-ax5.set_ylabel("Nombre d'accidents")
-ax5.grid(True)
-fig5.tight_layout()
-st.pyplot(fig5)
+
+def accidents_par_age():
+    age_distribution = data["Age_calculé"].value_counts().sort_index()
+
+    fig5, ax5 = new_figure(figsize=(8, 5))
+    age_distribution.plot(kind="bar", ax=ax5)
+    ax5.set_title("Nombre d'accidents par tranche d'âge")
+    ax5.set_xlabel("Âge")
+    ax5.set_ylabel("Nombre d'accidents")
+    ax5.grid(True)
+    fig5.tight_layout()
+    return fig5
+
+
+# Les âges dépendent de la date du jour : elle fait partie de la clé du graphique
+show_chart(
+    f"par_age_{aujourd_hui.date()}", accidents_par_age, version, empreinte_filtres
+)
 
 # --- Répartition selon le moment de l'accident ---
 st.subheader("Répartition des accidents par moment de service")
-moment_distribution = data["Moment de l'accident"].value_counts()
 
-fig6, ax6 = plt.subplots(figsize=(8, 5))
-moment_distribution.plot(kind="bar", ax=ax6)
-ax6.set_title("Répartition des accidents par moment de service")
-ax6.set_xlabel("Moment")
-ax6.set_ylabel("Nombre d'accidents")
-ax6.grid(True)
-fig6.tight_layout()
-st.pyplot(fig6)
+
+def accidents_par_moment():
+    moment_distribution = count_by(data, "Moment de l'accident")
+
+    fig6, ax6 = new_figure(figsize=(8, 5))
+    moment_distribution.plot(kind="bar", ax=ax6)
+    ax6.set_title("Répartition des accidents par moment de service")
+    ax6.set_xlabel("Moment")
+    ax6.set_ylabel("Nombre d'accidents")
+    ax6.grid(True)
+    fig6.tight_layout()
+    return fig6
+
+
+show_chart("par_moment", accidents_par_moment, version, empreinte_filtres)
 
 
 # Statistiques durée arrêt
@@ -334,23 +252,63 @@ st.write(data["Durée totale arrêt"].describe())
 
 
 st.subheader("📊 Blessures par type de sport")
-sport_counts = data["Type de sport"].value_counts().dropna()
+sport_counts = count_by(data, "Type de sport")
 st.bar_chart(sport_counts)
 
 # --- 2. Blessures par heure ---
 st.subheader("🕒 Blessures par heure de la journée")
-heures = data["Heure_accident"].value_counts().sort_index()
+heures = count_by(data, "Heure_accident", ordered=True)
 st.bar_chart(heures)
 
 # --- Visualisation de la répartition des blessures par catégorie ---
 st.subheader("Répartition des blessures par catégorie")
-fig_cat, ax_cat = plt.subplots()
-data["Catégorie blessure"].value_counts().plot(kind="bar", ax=ax_cat)
-ax_cat.set_title("Blessures par catégorie (Musculaire, Osseuse, etc.)")
-ax_cat.set_xlabel("Catégorie")
-ax_cat.set_ylabel("Nombre de blessures")
-ax_cat.grid(True)
-st.pyplot(fig_cat)
+
+
+def blessures_par_categorie():
+    fig_cat, ax_cat = new_figure()
+    data["Catégorie blessure"].value_counts().plot(kind="bar", ax=ax_cat)
+    ax_cat.set_title("Blessures par catégorie (Musculaire, Osseuse, etc.)")
+    ax_cat.set_xlabel("Catégorie")
+    ax_cat.set_ylabel("Nombre de blessures")
+    ax_cat.grid(True)
+    return fig_cat
+
+
+show_chart("par_categorie", blessures_par_categorie, version, empreinte_filtres)
+
+
+# --- Accidents et condition physique ---
+# Index matricule → fiche SPV/SPP, construit une fois pour tout le processus
+@st.cache_resource(show_spinner="Indexation des matricules...")
+def fitness_sources():
+    sources = {}
+    for statut, load in [("SPV", load_spv), ("SPP", load_spp)]:
+        fitness = load(columns=["matricule"] + COLONNES_JOINTURE)
+        sources[statut] = (fitness, build_matricule_index(fitness))
+    return sources
+
+
+st.subheader("🏃 Accidents selon la condition physique")
+sources = fitness_sources()
+if statuts:
+    sources = {s: sources[s] for s in statuts if s in sources}
+accidents_physique = join_fitness(data, sources)
+st.write(
+    f"Accidents rattachés à une fiche de condition physique : "
+    f"{accidents_physique['couleur_globale'].notna().sum()} / {len(data)}"
+)
+if sources:
+    # Un agent par matricule, parmi les statuts filtrés
+    agents = pd.concat(
+        [fitness.iloc[index["positions"]] for fitness, index in sources.values()]
+    )
+    for col, titre in [
+        ("couleur_globale", "Niveau ICP"),
+        ("imc_cat", "Catégorie d'IMC"),
+        ("tranche_age", "Tranche d'âge"),
+    ]:
+        st.markdown(f"#### Taux d'accidents par {titre.lower()}")
+        st.dataframe(accident_rate_by(accidents_physique, agents, col))
 
 
 # Chargement image
@@ -475,7 +433,9 @@ matricule_input_map = st.text_input(
 )
 
 if matricule_input_map:
-    blessure_agent = data[data["Mat."] == str(matricule_input_map)][
+    # Matricule saisi normalisé comme la colonne (entier, NA si invalide)
+    matricule_agent = normalize_matricule(pd.Series([matricule_input_map])).iloc[0]
+    blessure_agent = data[data["Mat."].eq(matricule_agent).fillna(False)][
         [
             "Age",
             "Siège normalisé",
@@ -490,10 +450,6 @@ if matricule_input_map:
         st.write(f"🔎 Blessures relevées pour l'agent {matricule_input_map}:")
         st.dataframe(blessure_agent)
 
-        fig, ax = plt.subplots(figsize=(4, 7))
-        ax.imshow(image)
-        ax.axis("off")
-
         # Sièges par défaut (non précisés) → rediriger vers un seul côté (gauche ici)
         lateralisation_par_defaut = {
             "Avant-bras": "Avant-bras gauche",
@@ -505,52 +461,62 @@ if matricule_input_map:
             "Cheville": "Cheville gauche",
         }
 
-        for _, row in blessure_agent.iterrows():
-            siege_base = row["Siège normalisé"]
-            lesion = row["Nature lésion"]
-
-            # Forcer côté gauche si siège non latéralisé
-            # Fusionner vers zone centrale
-            fusion_zones = {
-                "Épaule gauche": "Épaule",
-                "Épaule droite": "Épaule",
-                "Avant-bras gauche": "Avant-bras",
-                "Avant-bras droit": "Avant-bras",
-                "Coude gauche": "Coude",
-                "Coude droit": "Coude",
-                "Poignet gauche": "Poignet",
-                "Poignet droit": "Poignet",
-                "Main gauche": "Main",
-                "Main droite": "Main",
-                "Genou gauche": "Genou",
-                "Genou droit": "Genou",
-                "Cheville gauche": "Cheville",
-                "Cheville droite": "Cheville",
-            }
-            siege = fusion_zones.get(siege_base, siege_base)
-
-            if siege in siege_map:
-                x, y = siege_map[siege]
-                ax.plot(x * image.shape[1], y * image.shape[0], "ro", markersize=10)
-                ax.text(
-                    x * image.shape[1],
-                    y * image.shape[0] - 10,
-                    siege_base,  # Affiche le texte d'origine (pas le siège redirigé)
-                    color="white",
-                    fontsize=8,
-                    ha="center",
-                    va="center",
-                    bbox=dict(
-                        facecolor="black",
-                        edgecolor="none",
-                        alpha=0.6,
-                        boxstyle="round,pad=0.2",
-                    ),
-                )
-            else:
-                st.warning(f"❗️ Le siège « {siege_base} » n'est pas mappé.")
-
-        st.pyplot(fig)
+        # Forcer côté gauche si siège non latéralisé
+        # Fusionner vers zone centrale
+        fusion_zones = {
+            "Épaule gauche": "Épaule",
+            "Épaule droite": "Épaule",
+            "Avant-bras gauche": "Avant-bras",
+            "Avant-bras droit": "Avant-bras",
+            "Coude gauche": "Coude",
+            "Coude droit": "Coude",
+            "Poignet gauche": "Poignet",
+            "Poignet droit": "Poignet",
+            "Main gauche": "Main",
+            "Main droite": "Main",
+            "Genou gauche": "Genou",
+            "Genou droit": "Genou",
+            "Cheville gauche": "Cheville",
+            "Cheville droite": "Cheville",
+        }
+        # (siège d'origine, zone de la carte) de chaque blessure
+        sieges = [
+            (siege_base, fusion_zones.get(siege_base, siege_base))
+            for siege_base in blessure_agent["Siège normalisé"]
+        ]
+        for siege_base, siege in sieges:
+            if siege not in siege_map:
+                st.warning(f"❗️ Le siège « {siege_base} » n'est pas mappé.")
+
+        def carte_agent():
+            fig, ax = new_figure(figsize=(4, 7))
+            ax.imshow(image)
+            ax.axis("off")
+
+            for siege_base, siege in sieges:
+                if siege in siege_map:
+                    x, y = siege_map[siege]
+                    ax.plot(x * image.shape[1], y * image.shape[0], "ro", markersize=10)
+                    ax.text(
+                        x * image.shape[1],
+                        y * image.shape[0] - 10,
+                        siege_base,  # Affiche le texte d'origine (pas le siège redirigé)
+                        color="white",
+                        fontsize=8,
+                        ha="center",
+                        va="center",
+                        bbox=dict(
+                            facecolor="black",
+                            edgecolor="none",
+                            alpha=0.6,
+                            boxstyle="round,pad=0.2",
+                        ),
+                    )
+            return fig
+
+        show_chart(
+            f"carte_agent_{matricule_agent}", carte_agent, version, empreinte_filtres
+        )
 
 
 # Application de la latéralisation
@@ -606,63 +572,59 @@ data_valides["Zone fusionnée"] = data_valides["Siège latéralisé"].replace(fu
 compte_zones = data_valides["Zone fusionnée"].value_counts()
 
 
-# Créer l’image
-fig_global, ax_global = plt.subplots(figsize=(5, 9))
-ax_global.imshow(image)
-ax_global.axis("off")
-
-# Affichage des points + texte avec nom + %
-for siege, count in compte_zones.items():
-    if siege in siege_map:
-        x, y = siege_map[siege]
-        pourcentage = count / total_blessures * 100
+for siege in compte_zones.index:
+    if siege not in siege_map:
+        st.warning(f"Zone non trouvée sur la carte : {siege}")
 
-        # Point rouge
-        ax_global.plot(
-            x * image.shape[1],
-            y * image.shape[0],
-            "ro",
-            markersize=5 + (pourcentage * 0.3),
-        )
 
-        # Texte avec nom + %
-        # Texte avec nom + %
-        ax_global.text(
-            x * image.shape[1],
-            y * image.shape[0] - 10,
-            f"{siege.title()}\n{pourcentage:.1f}%",
-            color="white",
-            fontsize=6,  # 🔽 police plus petite
-            ha="center",
-            va="center",
-            bbox=dict(
-                facecolor="black",
-                alpha=0.7,
-                edgecolor="none",
-                boxstyle="round,pad=0.1",  # 🔽 encadré plus serré
-            ),
-        )
+def carte_globale():
+    # Créer l’image
+    fig_global, ax_global = new_figure(figsize=(5, 9))
+    ax_global.imshow(image)
+    ax_global.axis("off")
+
+    # Affichage des points + texte avec nom + %
+    for siege, count in compte_zones.items():
+        if siege in siege_map:
+            x, y = siege_map[siege]
+            pourcentage = count / total_blessures * 100
+
+            # Point rouge
+            ax_global.plot(
+                x * image.shape[1],
+                y * image.shape[0],
+                "ro",
+                markersize=5 + (pourcentage * 0.3),
+            )
+
+            # Texte avec nom + %
+            ax_global.text(
+                x * image.shape[1],
+                y * image.shape[0] - 10,
+                f"{siege.title()}\n{pourcentage:.1f}%",
+                color="white",
+                fontsize=6,  # 🔽 police plus petite
+                ha="center",
+                va="center",
+                bbox=dict(
+                    facecolor="black",
+                    alpha=0.7,
+                    edgecolor="none",
+                    boxstyle="round,pad=0.1",  # 🔽 encadré plus serré
+                ),
+            )
+    return fig_global
 
-    else:
-        st.warning(f"Zone non trouvée sur la carte : {siege}")
 
 # Affichage Streamlit
-st.pyplot(fig_global)
+show_chart("carte_globale", carte_globale, version, empreinte_filtres)
 
 # --- 📌 Carte des blessures par territoire (compagnie) ---
 # --- 📌 Carte des blessures par territoire (compagnie) ---
 
 
-# --- Mapping CIS vers Compagnie ---
-
-
-# --- Nettoyage et normalisation ---
-data["CIS"] = data["CIS"].astype(str).str.strip().str.upper()
-data["CIS normalisé"] = data["CIS"].map(cis_compagnie_mapping)
-
-
 # Recalculer les blessures par CIS filtré
-blessures_par_cis = data["CIS"].value_counts()
+blessures_par_cis = data["CIS"].value_counts().loc[lambda s: s > 0]
 total_blessures = blessures_par_cis.sum()
 
 # Ratios dynamiques selon les filtres
@@ -803,43 +765,51 @@ offsets = {
 
 st.subheader("🗺️ Carte des blessures par territoire (avec effectif et ratio %)")
 
-# Création du graphique matplotlib
-fig_map, ax_map = plt.subplots(figsize=(10, 12))
-ax_map.imshow(img)
-ax_map.axis("off")
-
-# Affichage des points avec annotations
-for point in data_points:
-    x = point["x"]
-    y = point["y"]
-    y_offset = np.random.randint(-15, 15)  # Décalage aléatoire pour éparpiller
-
-    ax_map.plot(x, y, "ro", markersize=6)
-
-    annotation = f"{point['CIS']}\n{point['Blessures']} blessés\n{point['Ratio']:.1f}%"
-
-    offset = offsets.get(point["CIS"], (0, np.random.randint(-15, 15)))
-    x_offset, y_offset = offset
-
-    ax_map.text(
-        x + x_offset,
-        y + y_offset,
-        annotation,
-        fontsize=6,
-        color="white",
-        ha="center",
-        va="center",
-        bbox=dict(
-            facecolor="black",
-            alpha=0.7,
-            edgecolor="none",
-            boxstyle="round,pad=0.2",
-        ),
-    )
-
 if not data_points:
     st.warning("Aucun CIS avec des données pour ces filtres.")
     st.stop()
 
+
+def carte_territoires():
+    # Création du graphique matplotlib
+    fig_map, ax_map = new_figure(figsize=(10, 12))
+    ax_map.imshow(img)
+    ax_map.axis("off")
+    # Décalages aléatoires pour éparpiller les étiquettes, tirés d'une graine
+    # fixe : l'image mise en cache est la même quelle que soit la session
+    rng = np.random.default_rng(0)
+
+    # Affichage des points avec annotations
+    for point in data_points:
+        x = point["x"]
+        y = point["y"]
+
+        ax_map.plot(x, y, "ro", markersize=6)
+
+        annotation = (
+            f"{point['CIS']}\n{point['Blessures']} blessés\n{point['Ratio']:.1f}%"
+        )
+
+        offset = offsets.get(point["CIS"], (0, rng.integers(-15, 15)))
+        x_offset, y_offset = offset
+
+        ax_map.text(
+            x + x_offset,
+            y + y_offset,
+            annotation,
+            fontsize=6,
+            color="white",
+            ha="center",
+            va="center",
+            bbox=dict(
+                facecolor="black",
+                alpha=0.7,
+                edgecolor="none",
+                boxstyle="round,pad=0.2",
+            ),
+        )
+    return fig_map
+
+
 # Affichage de la figure dans Streamlit
-st.pyplot(fig_map)
+show_chart("carte_territoires", carte_territoires, version, empreinte_filtres)
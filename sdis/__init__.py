@@ -0,0 +1,2 @@
+# Couche partagée entre les pages Streamlit : chargement, nettoyage et
+# préparation des données SPV, SPP et accidentologie.
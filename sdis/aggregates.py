@@ -0,0 +1,69 @@
+import pandas as pd
+
+from sdis.mappings import categories_blessure_mapping
+
+# Agrégats affichés par les pages, réutilisables hors Streamlit (sdis.query).
+
+COULEURS_ICP_SCOREES = ["Vert", "Orange", "Rouge"]
+
+
+def add_icp_percentages(tab):
+    """Ajoute le total et le pourcentage de chaque couleur à une table de
+    répartition (lignes × couleur_globale)."""
+    tab["Total"] = tab.sum(axis=1)
+    for color in COULEURS_ICP_SCOREES:
+        if color in tab.columns:
+            tab[f"% {color}"] = round(100 * tab[color] / tab["Total"], 1)
+    return tab
+
+
+def icp_table(df, col):
+    """Répartition des niveaux ICP par valeur de `col`."""
+    tab = (
+        df.groupby([col, "couleur_globale"], observed=True).size().unstack(fill_value=0)
+    )
+    return add_icp_percentages(tab)
+
+
+def means(df, columns, by=None):
+    columns = [c for c in columns if c in df.columns]
+    if by is None:
+        return df[columns].mean().to_frame("moyenne")
+    return df.groupby(by, observed=True)[columns].mean()
+
+
+def count_by(data, col, ordered=False):
+    """Nombre de lignes par valeur : dans l'ordre des valeurs si `ordered`
+    (années, jours, heures), sinon par effectif décroissant."""
+    counts = data[col].value_counts()
+    if ordered:
+        return counts.sort_index()
+    return counts.loc[lambda s: s > 0]
+
+
+def mean_duration_by(data, col):
+    """Durée moyenne d'arrêt par valeur de `col`, décroissante."""
+    return (
+        data.groupby(col, observed=True)["Durée totale arrêt"]
+        .mean()
+        .dropna()
+        .sort_values(ascending=False)
+    )
+
+
+def categorie_blessure(data):
+    return data["Nature lésion"].map(categories_blessure_mapping).fillna("Autres")
+
+
+def accident_rate_by(accidents, agents, col):
+    """Accidents rapportés à l'effectif des agents, par classe `col`."""
+    tab = pd.DataFrame(
+        {
+            "Agents": agents[col].value_counts(),
+            "Accidents": accidents[col].value_counts(),
+        }
+    )
+    tab = tab.fillna(0).astype("int64")
+    tab = tab[tab["Agents"] > 0]
+    tab["Accidents pour 100 agents"] = round(100 * tab["Accidents"] / tab["Agents"], 1)
+    return tab
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+# Index bitmap des dimensions filtrées par liste déroulante (Cie, UT, sexe...).
+# Pour chaque valeur distincte, un bitmap compressé (np.packbits, 1 bit par
+# ligne) marque les lignes qui portent cette valeur. Construit une seule fois
+# au chargement : une sélection multiple devient un OU de bitmaps et la
+# combinaison de plusieurs dimensions un ET, sans comparer de chaînes.
+
+
+def build_bitmap_index(values):
+    """Index bitmap d'une colonne : {valeur: bitmap compressé}."""
+    codes, uniques = pd.factorize(values, sort=True)
+    bitmaps = {}
+    for code, value in enumerate(uniques):
+        bitmaps[value] = np.packbits(codes == code)
+    return {"type": "bitmap", "n": len(values), "bitmaps": bitmaps}
+
+
+def build_bitmap_indexes(df, columns):
+    return {col: build_bitmap_index(df[col]) for col in columns if col in df.columns}
+
+
+def bitmap_union(index, selected):
+    """OU des bitmaps des valeurs sélectionnées (valeurs absentes ignorées)."""
+    bits = _empty(index)
+    for value in selected:
+        if value in index["bitmaps"]:
+            bits |= index["bitmaps"][value]
+    return bits
+
+
+def bitmap_to_mask(bits, n):
+    return np.unpackbits(bits, count=n).astype(bool)
+
+
+def _empty(index):
+    return np.zeros((index["n"] + 7) // 8, dtype=np.uint8)
@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+
+# Taille par défaut du cache des résultats de filtres (positions de lignes)
+FILTER_CACHE_BYTES = 64 * 1024 * 1024
+# Taille par défaut du cache des graphiques rendus (octets PNG)
+CHART_CACHE_BYTES = 128 * 1024 * 1024
+
+
+def _sizeof(value):
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return len(value)
+
+
+class LRUCache:
+    """Cache LRU borné en mémoire, partageable entre sessions (threads).
+
+    Les entrées les moins récemment utilisées sont évincées dès que la
+    taille cumulée dépasse `max_bytes`. Les compteurs de succès et d'échecs
+    permettent de suivre l'efficacité du cache.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entrées": len(self._entries),
+                "octets": self.nbytes,
+                "succès": self.hits,
+                "échecs": self.misses,
+            }
+
+
+# Caches uniques par processus, partagés entre toutes les sessions des pages :
+# résultats de filtres (positions des lignes) et graphiques rendus (PNG)
+_FILTER_CACHE = LRUCache(FILTER_CACHE_BYTES)
+_CHART_CACHE = LRUCache(CHART_CACHE_BYTES)
+
+
+def filter_cache():
+    return _FILTER_CACHE
+
+
+def chart_cache():
+    return _CHART_CACHE
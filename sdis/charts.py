@@ -0,0 +1,116 @@
+import io
+import threading
+import weakref
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from sdis.cache import chart_cache, filter_cache
+
+# Graphiques rendus une seule fois par état de filtres. Les pages ne
+# transmettent pas de figure mais une fonction qui la construit : en cas de
+# succès du cache (sdis.cache.LRUCache, partagé entre sessions), les octets
+# PNG sont resservis sans calcul ni rendu matplotlib.
+#
+# Les figures sont créées par new_figure, hors du gestionnaire de figures de
+# pyplot (qui les garde en mémoire jusqu'à plt.close), avec un canevas Agg
+# non interactif, et libérées dès leur rendu PNG. Les figures encore
+# vivantes sont suivies pour rendre les fuites visibles (figure_stats).
+
+# Paramètres de rendu de st.pyplot
+PNG_DPI = 200
+
+_live_figures = weakref.WeakSet()
+_lock = threading.Lock()
+
+
+def new_figure(figsize=None, **kwargs):
+    """Équivalent de plt.subplots : (figure, axes) sur un canevas Agg."""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    with _lock:
+        _live_figures.add(fig)
+    return fig, fig.subplots(**kwargs)
+
+
+def release_figure(fig):
+    """Libère les artistes et le raster de la figure."""
+    fig.clear()
+    with _lock:
+        _live_figures.discard(fig)
+
+
+def figure_stats():
+    """Figures créées par new_figure et non encore libérées, avec la
+    taille de leur raster RGBA."""
+    with _lock:
+        figures = list(_live_figures)
+    return {
+        "figures": len(figures),
+        "octets": sum(int(f.bbox.width * f.bbox.height * 4) for f in figures),
+    }
+
+
+def figure_png(fig):
+    """Rendu PNG d'une figure matplotlib."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=PNG_DPI, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def chart_key(chart_id, version, filters_key):
+    """Clé d'un graphique : identifiant, version du jeu de données et
+    empreinte des filtres (sdis.filters.filter_key)."""
+    return (chart_id, version, filters_key)
+
+
+def cached_chart(cache, key, draw):
+    """Octets PNG du graphique `key` ; `draw()` (→ Figure) n'est appelé
+    que si le graphique n'est pas déjà dans le cache, et la figure est
+    libérée après son rendu."""
+    png = cache.get(key)
+    if png is None:
+        fig = draw()
+        try:
+            png = figure_png(fig)
+        finally:
+            release_figure(fig)
+        cache.put(key, png)
+    return png
+
+
+# Affichage dans les pages : streamlit n'est importé qu'à l'appel, le reste du
+# module restant utilisable sans serveur
+
+
+def show_chart(chart_id, draw, version, filters_key):
+    """Affiche le graphique `chart_id`, construit par `draw()` seulement
+    s'il n'a pas déjà été rendu pour cette version et cet état de filtres."""
+    import streamlit as st
+
+    key = chart_key(chart_id, version, filters_key)
+    st.image(cached_chart(chart_cache(), key, draw))
+
+
+def show_cache_stats():
+    """Légendes de la barre latérale : efficacité des caches partagés et
+    figures encore en mémoire (hors rendu en cours, elles signalent une
+    fuite)."""
+    import matplotlib.pyplot as plt
+    import streamlit as st
+
+    filters = filter_cache().stats()
+    st.sidebar.caption(
+        f"Cache des filtres : {filters['succès']} succès, "
+        f"{filters['échecs']} échecs, {filters['entrées']} entrées"
+    )
+    charts = chart_cache().stats()
+    st.sidebar.caption(
+        f"Cache des graphiques : {charts['succès']} succès, "
+        f"{charts['échecs']} échecs, {charts['octets'] // 1024} Ko"
+    )
+    figures = figure_stats()
+    st.sidebar.caption(
+        f"Figures ouvertes : {figures['figures']} ({figures['octets'] // 1024} Ko), "
+        f"{len(plt.get_fignums())} via pyplot"
+    )
@@ -0,0 +1,66 @@
+import numpy as np
+
+# Règles de nettoyage appliquées une seule fois à la construction du snapshot.
+# Chaque règle cible une colonne : `mask(df)` sélectionne les lignes à
+# corriger, `fix(values)` renvoie les valeurs corrigées pour ces lignes.
+# Les règles s'appliquent dans l'ordre de la liste.
+
+TAILLE_HORS_PLAGE = {
+    "nom": "Taille hors 100–250 cm → inconnue",
+    "colonne": "taille",
+    # La taille est déjà convertie en mètres par le schéma
+    "mask": lambda df: (df["taille"] <= 1.0) | (df["taille"] > 2.5),
+    "fix": lambda values: np.nan,
+}
+SYSTOLIQUE_X10 = {
+    "nom": "Tension systolique > 250 → divisée par 10",
+    "colonne": "tension artérielle systol",
+    "mask": lambda df: df["tension artérielle systol"] > 250,
+    "fix": lambda values: values / 10,
+}
+DIASTOLIQUE_X10 = {
+    "nom": "Tension diastolique > 150 → divisée par 10",
+    "colonne": "tension artérielle diastol",
+    "mask": lambda df: df["tension artérielle diastol"] > 150,
+    "fix": lambda values: values / 10,
+}
+NIVEAU_LUC_SANS_PALIER = {
+    "nom": "Niveau Luc Léger forcé à 0 si palier = 0",
+    "colonne": "niveau luc léger",
+    "mask": lambda df: df["luc léger"] == 0,
+    "fix": lambda values: 0,
+}
+PALIER_LUC_X10 = {
+    # Erreur de saisie (ex : 93 → 9.3)
+    "nom": "Palier Luc Léger > 20 → divisé par 10",
+    "colonne": "luc léger",
+    "mask": lambda df: df["luc léger"] > 20,
+    "fix": lambda values: values / 10,
+}
+
+SPV_RULES = [TAILLE_HORS_PLAGE, SYSTOLIQUE_X10, DIASTOLIQUE_X10]
+SPP_RULES = [
+    NIVEAU_LUC_SANS_PALIER,
+    PALIER_LUC_X10,
+    TAILLE_HORS_PLAGE,
+    SYSTOLIQUE_X10,
+    DIASTOLIQUE_X10,
+]
+
+
+def clean(df, rules):
+    """Applique les règles par masques vectorisés.
+
+    Renvoie le DataFrame corrigé et le rapport d'anomalies : nombre de
+    lignes corrigées par règle.
+    """
+    report = {}
+    for rule in rules:
+        col = rule["colonne"]
+        if col not in df.columns:
+            continue
+        mask = rule["mask"](df).to_numpy()
+        report[rule["nom"]] = int(mask.sum())
+        if mask.any():
+            df.loc[mask, col] = rule["fix"](df.loc[mask, col])
+    return df, report
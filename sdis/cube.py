@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from sdis.filters import indexed_filter_mask
+
+# Cube de comptage dense sur des dimensions catégorielles (ex : cie × ut ×
+# sexe × aptitude × tranche d'âge × couleur ICP). Construit une seule fois par
+# version du jeu de données avec un unique np.bincount sur les codes
+# combinés. Tant que les filtres actifs ne portent que sur ces dimensions,
+# les tableaux de répartition s'obtiennent en sommant des tranches du cube,
+# sans parcourir les lignes. Chaque axe a une case finale pour les NaN.
+
+
+def build_cube(df, dimensions):
+    codes = []
+    categories = []
+    for col in dimensions:
+        values = df[col]
+        n = len(values.cat.categories)
+        col_codes = values.cat.codes.to_numpy()
+        codes.append(np.where(col_codes < 0, n, col_codes))
+        categories.append(list(values.cat.categories))
+    shape = tuple(len(c) + 1 for c in categories)
+    flat = np.ravel_multi_index(codes, shape)
+    counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+    return {"dimensions": list(dimensions), "categories": categories, "counts": counts}
+
+
+def cube_selections(df, filters, indexes, cube):
+    """Sélections par dimension du cube, ou None si un autre filtre est actif
+    (un curseur couvrant toute la plage est sans effet)."""
+    selections = {}
+    for spec in filters:
+        if spec["colonne"] not in df.columns:
+            continue
+        if spec["type"] == "isin" and spec["colonne"] in cube["dimensions"]:
+            if spec["valeurs"]:
+                selections[spec["colonne"]] = spec["valeurs"]
+            continue
+        if indexed_filter_mask(df, spec, indexes or {}) is not None:
+            return None
+    return selections
+
+
+def cube_table(cube, selections, rows, columns):
+    """Comptages rows × columns des lignes retenues par `selections`,
+    équivalent à groupby([rows, columns], observed=True).size().unstack()."""
+    counts = cube["counts"]
+    for axis, col in enumerate(cube["dimensions"]):
+        if col in selections:
+            labels = _axis_labels(cube, col, selections)
+            positions = [cube["categories"][axis].index(v) for v in labels]
+            counts = np.take(counts, positions, axis=axis)
+
+    row_axis = cube["dimensions"].index(rows)
+    col_axis = cube["dimensions"].index(columns)
+    other_axes = tuple(
+        axis for axis in range(counts.ndim) if axis not in (row_axis, col_axis)
+    )
+    table = counts.sum(axis=other_axes)
+    if row_axis > col_axis:
+        table = table.T
+
+    # Libellés des axes groupés (la case NaN est exclue, comme par groupby)
+    row_labels = _axis_labels(cube, rows, selections)
+    col_labels = _axis_labels(cube, columns, selections)
+    table = pd.DataFrame(
+        table[: len(row_labels), : len(col_labels)],
+        index=pd.Index(row_labels, name=rows),
+        columns=pd.Index(col_labels, name=columns),
+    )
+    # observed=True : seules les combinaisons présentes sont conservées
+    table = table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+    return table
+
+
+def _axis_labels(cube, col, selections):
+    categories = cube["categories"][cube["dimensions"].index(col)]
+    if col in selections:
+        # Ordre du dictionnaire de catégories, comme groupby
+        selected = set(selections[col])
+        return [c for c in categories if c in selected]
+    return categories
@@ -0,0 +1,110 @@
+import numpy as np
+
+# Histogrammes et densités des distributions affichées par les pages. Les
+# bornes des classes sont fixées une fois sur tout le jeu de données (les
+# histogrammes des données filtrées restent comparables entre eux) et la
+# densité est une KDE gaussienne calculée par convolution FFT des comptages
+# sur une grille fine : le coût est linéaire en nombre de lignes, au lieu
+# d'une évaluation du noyau par point de la courbe et par ligne.
+
+# Taille de la grille d'évaluation de la densité
+KDE_GRID_SIZE = 512
+
+
+def build_histogram_edges(df, bins):
+    """Bornes fixes par colonne ; `bins` associe à chaque colonne un nombre
+    de classes ou une règle de np.histogram_bin_edges ("auto", ...)."""
+    return {
+        col: np.histogram_bin_edges(df[col].dropna().to_numpy(dtype=float), bins=b)
+        for col, b in bins.items()
+        if col in df.columns
+    }
+
+
+def scott_bandwidth(values):
+    """Largeur de bande de Scott (défaut de scipy et seaborn)."""
+    if len(values) < 2:
+        return 0.0
+    return float(np.std(values, ddof=1)) * len(values) ** (-1 / 5)
+
+
+def fft_kde(values, lo, hi, bandwidth=None, grid_size=KDE_GRID_SIZE):
+    """Densité gaussienne de `values` sur une grille régulière [lo, hi].
+
+    Les valeurs sont réparties sur la grille (un seul np.bincount), puis
+    convoluées avec le noyau gaussien échantillonné, par FFT.
+    """
+    grid = np.linspace(lo, hi, grid_size)
+    if bandwidth is None:
+        bandwidth = scott_bandwidth(values)
+    if len(values) == 0 or bandwidth <= 0 or hi <= lo:
+        return grid, np.zeros(grid_size)
+
+    delta = grid[1] - grid[0]
+    positions = np.clip(np.rint((values - lo) / delta), 0, grid_size - 1)
+    counts = np.bincount(positions.astype(np.int64), minlength=grid_size)
+
+    # Noyau tronqué à 4 écarts-types, normalisé pour intégrer à 1
+    half = min(int(np.ceil(4 * bandwidth / delta)), grid_size - 1)
+    offsets = np.arange(-half, half + 1) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    kernel /= kernel.sum() * delta
+
+    nfft = 1 << int(grid_size + 2 * half).bit_length()
+    smoothed = np.fft.irfft(np.fft.rfft(counts, nfft) * np.fft.rfft(kernel, nfft), nfft)
+    density = smoothed[half : half + grid_size] / len(values)
+    return grid, np.maximum(density, 0.0)
+
+
+def histogram_density(values, edges):
+    """Comptages par classe et courbe de densité à l'échelle des comptages
+    (comme sns.histplot(kde=True)) pour les valeurs finies de `values`."""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    counts, _ = np.histogram(values, bins=edges)
+    grid, density = fft_kde(values, edges[0], edges[-1])
+    # Courbe en effectif par classe : densité × n × largeur de classe
+    scale = len(values) * (edges[-1] - edges[0]) / (len(edges) - 1)
+    return {"edges": edges, "counts": counts, "grid": grid, "kde": density * scale}
+
+
+def plot_histogram_density(ax, dist, color=None):
+    """Trace un résultat de histogram_density sur `ax`."""
+    bars = ax.bar(
+        dist["edges"][:-1],
+        dist["counts"],
+        width=np.diff(dist["edges"]),
+        align="edge",
+        color=color,
+        alpha=0.75,
+        edgecolor="white",
+    )
+    ax.plot(dist["grid"], dist["kde"], color=bars.patches[0].get_facecolor()[:3])
+
+
+def stacked_histogram(values, codes, edges, n_groups):
+    """Comptages (classe de `values` × groupe) en un seul passage sur les
+    données ; `codes` est le numéro de groupe (0 à n_groups - 1) de chaque
+    valeur, les autres codes sont ignorés."""
+    counts, _, _ = np.histogram2d(
+        values, codes, bins=[edges, np.arange(n_groups + 1) - 0.5]
+    )
+    return counts.astype(np.int64)
+
+
+def plot_stacked_histogram(ax, edges, counts, labels, colors, **kwargs):
+    """Histogramme empilé : une barre par groupe (colonne de `counts`), le
+    premier groupe en bas."""
+    centers = 0.5 * (edges[1:] + edges[:-1])
+    bottom = np.zeros(len(centers))
+    for i, (label, color) in enumerate(zip(labels, colors)):
+        ax.bar(
+            centers,
+            counts[:, i],
+            width=np.diff(edges),
+            bottom=bottom,
+            color=color,
+            label=label,
+            **kwargs,
+        )
+        bottom += counts[:, i]
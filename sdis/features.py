@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# Vitesse (km/h) associée à chaque palier Luc Léger
+palier_to_vitesse = {
+    0: 8.0,
+    1: 8.5,
+    2: 9.0,
+    3: 9.5,
+    4: 10.0,
+    5: 10.5,
+    6: 11.0,
+    7: 11.5,
+    8: 12.0,
+    9: 12.5,
+    10: 13.0,
+    11: 13.5,
+    12: 14.0,
+    13: 14.5,
+    14: 15.0,
+    15: 15.5,
+    16: 16.0,
+}
+
+# Bornes des classes d'âge et d'IMC (borne inférieure incluse), définies une
+# seule fois : les codes des catégorielles tranche_age et imc_cat servent
+# aussi aux filtres de la barre latérale
+BORNES_AGE = [16, 30, 40, 50, 58]
+BORNES_IMC = [18.5, 25.0, 30.0, 35.0, 40.0]
+
+COULEURS_ICP = ["Vert", "Orange", "Rouge", "Inconnu"]
+TRANCHES_AGE = ["16-29", "30-39", "40-49", "50-57", "58+", "Inconnu"]
+CATEGORIES_IMC = [
+    "Insuffisance pondérale",
+    "Normal",
+    "Surpoids",
+    "Obésité modérée",
+    "Obésité sévère",
+    "Obésité massive",
+    "Inconnu",
+]
+
+
+def _categorical(labels, categories, ordered=False):
+    return pd.Categorical(labels, categories=categories, ordered=ordered)
+
+
+def niveau_to_couleur(niveau):
+    """Niveau ICP (1, 2, ≥3) → couleur, pour une colonne entière."""
+    labels = np.select(
+        [niveau >= 3, niveau == 2, niveau == 1],
+        ["Vert", "Orange", "Rouge"],
+        default="Inconnu",
+    )
+    return _categorical(labels, COULEURS_ICP)
+
+
+def score_to_couleur(score):
+    """Score ICP moyen → couleur globale, pour une colonne entière."""
+    labels = np.select(
+        [score.isna(), score >= 2.7, score >= 1.5],
+        ["Inconnu", "Vert", "Orange"],
+        default="Rouge",
+    )
+    return _categorical(labels, COULEURS_ICP)
+
+
+def bin_codes(values, edges):
+    """Code entier de classe pour une colonne entière (np.digitize).
+
+    Le code i correspond à edges[i-1] <= valeur < edges[i] ; les valeurs
+    manquantes reçoivent le code -1.
+    """
+    values = values.to_numpy(dtype="float64", na_value=np.nan)
+    codes = np.digitize(values, edges)
+    return np.where(np.isnan(values), -1, codes)
+
+
+def age_to_categorie(age):
+    # Code 0 (moins de 16 ans, âge aberrant) et NaN → "Inconnu"
+    codes = bin_codes(age, BORNES_AGE) - 1
+    codes = np.where(codes < 0, TRANCHES_AGE.index("Inconnu"), codes)
+    return pd.Categorical.from_codes(codes, categories=TRANCHES_AGE, ordered=True)
+
+
+def classify_imc(imc):
+    codes = bin_codes(imc, BORNES_IMC)
+    codes = np.where(codes < 0, CATEGORIES_IMC.index("Inconnu"), codes)
+    return pd.Categorical.from_codes(codes, categories=CATEGORIES_IMC, ordered=True)
+
+
+def add_fitness_features(df, age_col):
+    """Ajoute les indicateurs dérivés (VO2max, couleurs ICP, tranches).
+
+    Calculés une seule fois à la construction du snapshot, de façon
+    vectorisée ; les pages se contentent ensuite de sélectionner des lignes.
+    """
+    # Convertir sexe en numérique
+    df["sexe_num"] = df["sexe"].str.upper().eq("M").astype("int64")
+
+    # Convertir palier Luc Léger en vitesse, 0 si NaN
+    df["vitesse"] = df["luc léger"].map(palier_to_vitesse).fillna(0)
+
+    # Calcul VO2max de la formule avec âge, sexe et vitesse
+    df["vo2max"] = (
+        31.025
+        + 3.238 * df["vitesse"]
+        - 3.248 * df[age_col].fillna(0)
+        + 6.318 * df["sexe_num"]
+    ).clip(lower=0)
+
+    # Formule de Léger (1988)
+    df["vo2max_leger"] = (5.857 * df["vitesse"] - 19.458).clip(lower=0)
+
+    # Indicateurs ICP
+    df["couleur_luc"] = niveau_to_couleur(df["niveau luc léger"])
+    df["couleur_pompes"] = niveau_to_couleur(df["niveau pompes"])
+    df["couleur_tractions"] = niveau_to_couleur(df["niveau tractions"])
+    df["score_moyen"] = df[
+        ["niveau luc léger", "niveau pompes", "niveau tractions"]
+    ].mean(axis=1)
+    df["couleur_globale"] = score_to_couleur(df["score_moyen"])
+
+    df["tranche_age"] = age_to_categorie(df[age_col])
+    df["imc_cat"] = classify_imc(df["imc"])
+    return df
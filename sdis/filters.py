@@ -0,0 +1,238 @@
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from sdis.bitmaps import bitmap_to_mask, bitmap_union
+from sdis.ranges import range_rows, rows_to_mask
+
+# Moteur de filtres : l'état de la barre latérale est décrit par une liste de
+# filtres déclaratifs, compilée en un seul masque booléen NumPy sur la table
+# de base. La vue filtrée n'est matérialisée qu'une fois, à la fin.
+# Chaque filtre est un dict :
+#   - type     : "isin", "between" ou "classes"
+#   - colonne  : colonne ciblée (filtre ignoré si absente)
+#   - valeurs  : pour "isin" et "classes", sélection de l'utilisateur
+#                (sélection vide → filtre inactif)
+#   - min_value/max_value : pour "between", bornes incluses ; fillna
+#                remplace les NaN avant comparaison
+#   - classes  : pour "classes", libellé → fonction masque sur les valeurs
+
+# Libellés des listes déroulantes → catégories précalculées (codes de classe
+# de tranche_age et imc_cat, voir sdis.features)
+CLASSES_AGE = {
+    "16 à 29": "16-29",
+    "30 à 39": "30-39",
+    "40 à 49": "40-49",
+    "50 à 57": "50-57",
+    "plus de 57": "58+",
+}
+CLASSES_IMC = {
+    "Normal (18.5 - 24.9)": "Normal",
+    "Surpoids (25.0 - 29.9)": "Surpoids",
+    "Obésité modérée (30.0 - 34.9)": "Obésité modérée",
+    "Obésité sévère (35.0 - 39.9)": "Obésité sévère",
+    "Obésité massive (>40)": "Obésité massive",
+}
+CLASSES_LUC_LEGER = {
+    "0": lambda palier: palier == 0,
+    "1": lambda palier: palier == 1,
+    "2": lambda palier: palier == 2,
+    "3": lambda palier: palier == 3,
+    "4": lambda palier: palier == 4,
+    "5": lambda palier: palier == 5,
+    "plus de 6": lambda palier: palier >= 6,
+}
+
+
+def isin(colonne, valeurs):
+    return {"type": "isin", "colonne": colonne, "valeurs": list(valeurs)}
+
+
+def isin_labels(colonne, valeurs, libelles):
+    """Filtre "isin" à partir des libellés affichés (libellés inconnus, ex :
+    "Tous", ignorés)."""
+    return isin(colonne, [libelles[v] for v in valeurs if v in libelles])
+
+
+def between(colonne, min_value, max_value, fillna=None):
+    return {
+        "type": "between",
+        "colonne": colonne,
+        "min_value": min_value,
+        "max_value": max_value,
+        "fillna": fillna,
+    }
+
+
+def classes(colonne, valeurs, definitions):
+    return {
+        "type": "classes",
+        "colonne": colonne,
+        "valeurs": list(valeurs),
+        "classes": definitions,
+    }
+
+
+def _numeric(values, fillna=None):
+    values = values.to_numpy(dtype="float64", na_value=np.nan)
+    if fillna is not None:
+        values = np.where(np.isnan(values), fillna, values)
+    return values
+
+
+def filter_mask(df, spec):
+    """Masque booléen d'un filtre, ou None si le filtre est inactif."""
+    values = df[spec["colonne"]]
+
+    if spec["type"] == "isin":
+        if not spec["valeurs"]:
+            return None
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Table de correspondance code → sélectionné, indexée par les
+            # codes entiers ; la case finale (False) reçoit le code -1 des NaN
+            codes = values.cat.categories.get_indexer(spec["valeurs"])
+            lookup = np.zeros(len(values.cat.categories) + 1, dtype=bool)
+            lookup[codes[codes >= 0]] = True
+            return lookup[values.cat.codes.to_numpy()]
+        return values.isin(spec["valeurs"]).to_numpy()
+
+    if spec["type"] == "between":
+        values = _numeric(values, spec["fillna"])
+        return (values >= spec["min_value"]) & (values <= spec["max_value"])
+
+    if spec["type"] == "classes":
+        # Libellés inconnus (ex : "Tous") ignorés
+        selected = [spec["classes"][v] for v in spec["valeurs"] if v in spec["classes"]]
+        if not selected:
+            return None
+        values = _numeric(values)
+        mask = np.zeros(len(values), dtype=bool)
+        for condition in selected:
+            mask |= condition(values)
+        return mask
+
+    raise ValueError(f"Type de filtre inconnu : {spec['type']}")
+
+
+def indexed_filter_mask(df, spec, indexes):
+    """Masque d'un filtre, via son index (bitmap ou plage) s'il en a un."""
+    index = indexes.get(spec["colonne"])
+    if spec["type"] == "isin" and index and index["type"] == "bitmap":
+        if not spec["valeurs"]:
+            return None
+        return bitmap_to_mask(bitmap_union(index, spec["valeurs"]), len(df))
+    if spec["type"] == "between" and index and index["type"] == "range":
+        rows = range_rows(index, spec["min_value"], spec["max_value"], spec["fillna"])
+        return None if rows is None else rows_to_mask(rows, len(df))
+    return filter_mask(df, spec)
+
+
+def compile_filters(df, filters, indexes=None):
+    """Combine tous les filtres actifs en un seul masque (ET logique).
+
+    `indexes` (colonne → index) évite de parcourir les colonnes : les filtres
+    "isin" sont résolus par OU/ET d'index bitmap (sdis.bitmaps), les filtres
+    "between" par recherche dichotomique dans un index de plage
+    (sdis.ranges).
+    """
+    indexes = indexes or {}
+    mask = np.ones(len(df), dtype=bool)
+    bits = None
+    for spec in filters:
+        col = spec["colonne"]
+        if col not in df.columns:
+            continue
+        index = indexes.get(col)
+        if spec["type"] == "isin" and index and index["type"] == "bitmap":
+            # Bitmaps combinés sous forme compressée, décompressés une fois
+            if spec["valeurs"]:
+                spec_bits = bitmap_union(index, spec["valeurs"])
+                bits = spec_bits if bits is None else bits & spec_bits
+            continue
+        spec_mask = indexed_filter_mask(df, spec, indexes)
+        if spec_mask is not None:
+            mask &= spec_mask
+    if bits is not None:
+        mask &= bitmap_to_mask(bits, len(df))
+    return mask
+
+
+def compile_filters_incremental(df, filters, indexes=None, state=None, version=None):
+    """Comme compile_filters, en ne recalculant que les filtres modifiés.
+
+    `state` est un dict conservé d'une exécution à l'autre (st.session_state)
+    qui garde le masque de chaque filtre avec son empreinte : quand un seul
+    widget change, une seule colonne est parcourue avant le ET final.
+    """
+    indexes = indexes or {}
+    if state.get("version") != (version, len(df)):
+        state.clear()
+        state["version"] = (version, len(df))
+    previous = state.get("masques", {})
+    masks = {}
+    mask = np.ones(len(df), dtype=bool)
+    for spec in filters:
+        if spec["colonne"] not in df.columns:
+            continue
+        slot = (spec["type"], spec["colonne"])
+        key = filter_key([spec])
+        if slot in previous and previous[slot][0] == key:
+            spec_mask = previous[slot][1]
+        else:
+            spec_mask = indexed_filter_mask(df, spec, indexes)
+        masks[slot] = (key, spec_mask)
+        if spec_mask is not None:
+            mask &= spec_mask
+    state["masques"] = masks
+    return mask
+
+
+def count_rows(df, filters, indexes=None):
+    """Nombre de lignes retenues, sans matérialiser la vue filtrée."""
+    return int(np.count_nonzero(compile_filters(df, filters, indexes)))
+
+
+def filter_key(filters):
+    """Empreinte canonique de l'état des filtres : indépendante de l'ordre
+    des filtres et de l'ordre de sélection dans les listes déroulantes."""
+    canonical = []
+    for spec in filters:
+        entry = {k: v for k, v in spec.items() if k != "classes"}
+        if spec["type"] == "classes":
+            entry["valeurs"] = [v for v in spec["valeurs"] if v in spec["classes"]]
+        if "valeurs" in entry:
+            entry["valeurs"] = sorted(str(v) for v in entry["valeurs"])
+        canonical.append(entry)
+    canonical.sort(key=lambda e: (e["colonne"], e["type"]))
+    payload = json.dumps(canonical, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def filter_rows(df, filters, indexes=None, cache=None, version=None, state=None):
+    """Positions des lignes retenues par les filtres.
+
+    Avec un `cache` (sdis.cache.LRUCache partagé entre sessions), le
+    résultat est mémorisé sous (version du jeu de données, empreinte des
+    filtres) : un état de filtres déjà rencontré n'est pas recalculé.
+    Sinon, avec un `state` de session, seuls les filtres modifiés depuis
+    l'exécution précédente sont réévalués.
+    """
+    key = (version, filter_key(filters))
+    rows = cache.get(key) if cache is not None else None
+    if rows is None:
+        if state is not None:
+            mask = compile_filters_incremental(df, filters, indexes, state, version)
+        else:
+            mask = compile_filters(df, filters, indexes)
+        rows = np.flatnonzero(mask)
+        if cache is not None:
+            cache.put(key, rows)
+    return rows
+
+
+def apply_filters(df, filters, indexes=None, cache=None, version=None, state=None):
+    if cache is None and state is None:
+        return df[compile_filters(df, filters, indexes)]
+    return df.iloc[filter_rows(df, filters, indexes, cache, version, state)]
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+# Jointure accidents ↔ condition physique par matricule. Les matricules sont
+# normalisés en entiers (Int64) des deux côtés ; l'index (table de hachage
+# matricule → position de ligne) est construit une fois par jeu de données,
+# et la jointure se fait ensuite par un seul get_indexer vectorisé.
+
+# Indicateurs de condition physique rattachés aux accidents
+COLONNES_JOINTURE = ["vo2max", "imc", "imc_cat", "couleur_globale", "tranche_age"]
+
+
+def normalize_matricule(values):
+    """Matricules en entiers (Int64) ; valeurs non numériques → NA."""
+    return pd.to_numeric(values, errors="coerce").astype("Int64")
+
+
+def build_matricule_index(df, col="matricule"):
+    """Index matricule → position de la première ligne de l'agent (les
+    doublons du fichier source sont ignorés)."""
+    keys = normalize_matricule(df[col])
+    first = ~keys.duplicated() & keys.notna()
+    return {
+        "keys": pd.Index(keys[first].to_numpy(dtype="int64")),
+        "positions": np.flatnonzero(first.to_numpy()),
+    }
+
+
+def lookup_rows(index, matricules):
+    """Position de ligne de chaque matricule, -1 si inconnu."""
+    keys = normalize_matricule(matricules)
+    found = index["keys"].get_indexer(keys.fillna(-1).to_numpy(dtype="int64"))
+    return np.where(found >= 0, index["positions"][found], -1)
+
+
+def join_fitness(accidents, sources, columns=COLONNES_JOINTURE, mat_col="Mat."):
+    """Ajoute aux accidents les indicateurs de condition physique de l'agent.
+
+    `sources` associe un statut ("SPV", "SPP") au couple (DataFrame, index
+    matricule) du jeu de données correspondant ; les accidents sans fiche
+    reçoivent des valeurs manquantes.
+    """
+    joined = []
+    for statut, (fitness, index) in sources.items():
+        rows = accidents["Statut"] == statut
+        positions = lookup_rows(index, accidents.loc[rows, mat_col])
+        found = positions >= 0
+        part = fitness[columns].iloc[np.where(found, positions, 0)]
+        part.index = accidents.index[rows.to_numpy()]
+        joined.append(part.where(pd.Series(found, index=part.index), axis=0))
+    if not joined:
+        return accidents.assign(**{c: np.nan for c in columns})
+    return accidents.join(pd.concat(joined))
@@ -0,0 +1,174 @@
+import io
+
+import chardet
+import pandas as pd
+
+from sdis.cleaning import SPP_RULES, SPV_RULES, clean
+from sdis.features import add_fitness_features
+from sdis.mappings import cis_compagnie_mapping
+from sdis.schema import ACCIDENT_SCHEMA, FITNESS_SCHEMA, JOURS_SEMAINE, apply_schema
+from sdis.snapshot import data_path, file_hash, load_snapshot
+
+# À incrémenter à chaque modification des fonctions de parsing ci-dessous,
+# pour invalider les snapshots déjà écrits.
+SNAPSHOT_VERSION = 9
+
+# Taille de l'échantillon lu pour détecter l'encodage
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+SPV_CSV = "merged_data_spv.csv"
+SPP_CSV = "spp.csv"
+ACCIDENT_CSV = "accidentologie.csv"
+
+
+def _parse_fitness_csv(path):
+    df = pd.read_csv(path)
+
+    # Standardiser les noms de colonnes : minuscules, sans espace
+    df.columns = df.columns.str.strip().str.lower()
+
+    # Conversion typée des colonnes ('xx,yy' → float, unités, catégorielles)
+    apply_schema(df, FITNESS_SCHEMA)
+
+    return df
+
+
+def _parse_spv_csv(path):
+    df, report = clean(_parse_fitness_csv(path), SPV_RULES)
+    df = add_fitness_features(df, age_col="age_x")
+    df.attrs["anomalies"] = report
+    return df
+
+
+def _parse_spp_csv(path):
+    df, report = clean(_parse_fitness_csv(path), SPP_RULES)
+    df["luc_leger_arrondi"] = df["luc léger"].round().astype("Int64")
+    df = add_fitness_features(df, age_col="age")
+    df.attrs["anomalies"] = report
+    return df
+
+
+_encodings_by_hash = {}
+
+
+def sniff_encoding(path):
+    """Détecte l'encodage sur le début du fichier, mémorisé par empreinte."""
+    digest = file_hash(path)
+    if digest not in _encodings_by_hash:
+        with open(path, "rb") as f:
+            sample = f.read(ENCODING_SAMPLE_SIZE)
+        encoding = chardet.detect(sample)["encoding"] or "utf-8"
+        # Un début de fichier 100 % ASCII n'exclut pas des accents plus loin
+        if encoding.lower() == "ascii":
+            encoding = "utf-8"
+        _encodings_by_hash[digest] = encoding
+    return _encodings_by_hash[digest]
+
+
+def _read_accident_csv(path):
+    encoding = sniff_encoding(path)
+    try:
+        return pd.read_csv(path, sep=";", encoding=encoding)
+    except UnicodeDecodeError:
+        # L'échantillon n'était pas représentatif : détection sur tout le fichier
+        with open(path, "rb") as f:
+            encoding = chardet.detect(f.read())["encoding"]
+        _encodings_by_hash[file_hash(path)] = encoding
+        return pd.read_csv(path, sep=";", encoding=encoding)
+
+
+def _read_accident_delta(path, offset):
+    """Lit uniquement les lignes ajoutées après `offset`, avec l'en-tête."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(offset)
+        tail = f.read()
+    return pd.read_csv(
+        io.BytesIO(header + tail), sep=";", encoding=sniff_encoding(path)
+    )
+
+
+def _parse_accident_csv(path):
+    return _prepare_accident(_read_accident_csv(path))
+
+
+def _append_accident_csv(previous, path, offset):
+    """Ingestion incrémentale : seules les nouvelles déclarations sont
+    nettoyées, puis fusionnées avec le snapshot existant."""
+    delta = _prepare_accident(_read_accident_delta(path, offset))
+    if list(delta.columns) != list(previous.columns):
+        raise ValueError("Colonnes du CSV modifiées")
+    data = pd.concat([previous, delta], ignore_index=True)
+
+    # Une colonne texte peut avoir été lue comme numérique dans l'une des deux
+    # parties (ex : matricules) : on la ramène au texte, comme read_csv sur le
+    # fichier entier
+    for col in data.columns[data.dtypes == object]:
+        values = data[col]
+        data[col] = values.where(values.isna(), values.astype(str))
+
+    # Dictionnaires des catégorielles recalculés sur l'ensemble, comme lors
+    # d'une reconstruction complète
+    apply_schema(
+        data,
+        {
+            col: spec
+            for col, spec in ACCIDENT_SCHEMA.items()
+            if spec["dtype"] == "category"
+        },
+    )
+    return data
+
+
+def _prepare_accident(data):
+    # Nettoyage des données
+    data.columns = data.columns.str.replace("*", "", regex=False).str.strip()
+    data = data.drop(columns=["Agent"])
+
+    # Mapping CIS > compagnie
+    data["CIS"] = data["CIS"].astype(str).str.strip().str.upper()
+    data["CIS normalisé"] = data["CIS"].map(cis_compagnie_mapping)
+
+    # Dates au format explicite (pas d'inférence) et dimensions encodées en
+    # catégorielles (codes entiers pour les filtres)
+    apply_schema(data, ACCIDENT_SCHEMA)
+
+    data["Année"] = data["Date de l'accident"].dt.year
+    data["Mois"] = data["Date de l'accident"].dt.month
+    data["Jour"] = data["Date de l'accident"].dt.day
+    data["Jour_semaine"] = pd.Categorical(
+        data["Date de l'accident"].dt.day_name(),
+        categories=JOURS_SEMAINE,
+        ordered=True,
+    )
+    data["Durée totale arrêt"] = pd.to_numeric(
+        data["Durée totale arrêt"], errors="coerce"
+    )
+
+    # Heure au format HH:MM:SS : les deux premiers caractères suffisent
+    heure = pd.to_numeric(data["Heure de l'accident"].str.slice(0, 2), errors="coerce")
+    data["Heure_accident"] = heure.where(heure.between(0, 23))
+    return data
+
+
+def load_spv(columns=None):
+    return load_snapshot(
+        data_path(SPV_CSV), _parse_spv_csv, SNAPSHOT_VERSION, columns=columns
+    )
+
+
+def load_spp(columns=None):
+    return load_snapshot(
+        data_path(SPP_CSV), _parse_spp_csv, SNAPSHOT_VERSION, columns=columns
+    )
+
+
+def load_accident(columns=None):
+    # Les exports RH ajoutent les nouvelles déclarations en fin de fichier
+    return load_snapshot(
+        data_path(ACCIDENT_CSV),
+        _parse_accident_csv,
+        SNAPSHOT_VERSION,
+        columns=columns,
+        append=_append_accident_csv,
+    )
@@ -0,0 +1,134 @@
+# Référentiels partagés entre les pages.
+
+cis_compagnie_mapping = {
+    # Compagnie de Haguenau
+    "HAGUENAU": "Compagnie de Haguenau",
+    "BISCHWILLER": "Compagnie de Haguenau",
+    "BRUMATH": "Compagnie de Haguenau",
+    "DRUSENHEIM": "Compagnie de Haguenau",
+    "GAMBSHEIM": "Compagnie de Haguenau",
+    "GRIES": "Compagnie de Haguenau",
+    "HOCHFELDEN": "Compagnie de Haguenau",
+    "MERTZWILLER": "Compagnie de Haguenau",
+    "REICHSHOFFEN": "Compagnie de Haguenau",
+    "SOUFFLENHEIM": "Compagnie de Haguenau",
+    "VAL DE MODER": "Compagnie de Haguenau",
+    "WEITBRUCH": "Compagnie de Haguenau",
+    "WOERTH": "Compagnie de Haguenau",
+    "ROHRWILLER": "Compagnie de Haguenau",
+    "ROESCHWOOG": "Compagnie de Haguenau",
+    "OBERHOFFEN SUR MODER": "Compagnie de Haguenau",
+    "DURRENBACH": "Compagnie de Haguenau",
+    "BETSCHDORF": "Compagnie de Haguenau",
+    "RITTERSHOFFEN": "Compagnie de Haguenau",
+    "WEYERSHEIM": "Compagnie de Haguenau",
+    "HATTEN": "Compagnie de Haguenau",
+    "SALMBACH": "Compagnie de Haguenau",
+    "LOBSANN": "Compagnie de Haguenau",
+    "WINTERSHOUSE": "Compagnie de Haguenau",
+    "DURRENBACH-WALBOURG": "Compagnie de Haguenau",
+    # Compagnie de Saverne
+    "SAVERNE": "Compagnie de Saverne",
+    "DRULINGEN": "Compagnie de Saverne",
+    "INGWILLER": "Compagnie de Saverne",
+    "DOSSENHEIM S/ZINSEL": "Compagnie de Saverne",
+    "MONSWILLER": "Compagnie de Saverne",
+    "WIMMENAU": "Compagnie de Saverne",
+    "RAUWILLER": "Compagnie de Saverne",
+    "VOLKSBERG": "Compagnie de Saverne",
+    "PETERSBACH": "Compagnie de Saverne",
+    "WEISLINGEN": "Compagnie de Saverne",
+    "NIEDERBRONN LES BAIN": "Compagnie de Saverne",
+    "WINGEN SUR MODER": "Compagnie de Saverne",
+    # Compagnie de Molsheim
+    "MOLSHEIM": "Compagnie de Molsheim",
+    "MUTZIG": "Compagnie de Molsheim",
+    "WASSELONNE": "Compagnie de Molsheim",
+    "ROSHEIM": "Compagnie de Molsheim",
+    "WESTHOFFEN": "Compagnie de Molsheim",
+    "BERGBIETEN": "Compagnie de Molsheim",
+    "BARR": "Compagnie de Molsheim",
+    "ERNOLSHEIM S.BRUCHE": "Compagnie de Molsheim",
+    "STILL": "Compagnie de Molsheim",
+    "WOLFISHEIM": "Compagnie de Molsheim",
+    "ERGERSHEIM": "Compagnie de Molsheim",
+    "ALTECKENDORF": "Compagnie de Molsheim",
+    "SCHNERSHEIM": "Compagnie de Molsheim",
+    "BOERSCH": "Compagnie de Molsheim",
+    # Compagnie de Sélestat
+    "SELESTAT": "Compagnie de Sélestat",
+    "MUSSIG": "Compagnie de Sélestat",
+    "BALDENHEIM": "Compagnie de Sélestat",
+    "EBERSHEIM": "Compagnie de Sélestat",
+    "EBERSMUNSTER": "Compagnie de Sélestat",
+    "MUTTERSHOLTZ": "Compagnie de Sélestat",
+    "MARCKOLSHEIM": "Compagnie de Sélestat",
+    "SUNDHOUSE": "Compagnie de Sélestat",
+    "RHINAU": "Compagnie de Sélestat",
+    "HILSENHEIM": "Compagnie de Sélestat",
+    "OHNENHEIM": "Compagnie de Sélestat",
+    "DAMBACH-LA-VILLE": "Compagnie de Sélestat",
+    "BINDERNHEIM": "Compagnie de Sélestat",
+    # Compagnie de l'EMS Nord
+    "STRASBOURG NORD": "Compagnie de l'EMS Nord",
+    "BISCHHEIM": "Compagnie de l'EMS Nord",
+    "HOENHEIM": "Compagnie de l'EMS Nord",
+    "MITTELHAUSBERGEN": "Compagnie de l'EMS Nord",
+    "MUNDOLSHEIM": "Compagnie de l'EMS Nord",
+    "GRIESHEIM-SUR-SOUFFE": "Compagnie de l'EMS Nord",
+    "TRUCHTERSHEIM": "Compagnie de l'EMS Nord",
+    "LA SOUFFEL": "Compagnie de l'EMS Nord",
+    # Compagnie de l'EMS Centre
+    "STRASBOURG OUEST": "Compagnie de l'EMS Centre",
+    "STRASBOURG FINK": "Compagnie de l'EMS Centre",
+    "OSTWALD": "Compagnie de l'EMS Centre",
+    "LINGOLSHEIM": "Compagnie de l'EMS Centre",
+    "ILLKIRCH-GRAFFENSTAD": "Compagnie de l'EMS Centre",
+    "VILLE": "Compagnie de l'EMS Centre",
+    "FINKWILLER": "Compagnie de l'EMS Centre",
+    # Compagnie de l'EMS Sud
+    "STRASBOURG SUD": "Compagnie de l'EMS Sud",
+    "FEGERSHEIM": "Compagnie de l'EMS Sud",
+    "LIPSHEIM": "Compagnie de l'EMS Sud",
+    "NORDHOUSE": "Compagnie de l'EMS Sud",
+    "GEISPOLSHEIM": "Compagnie de l'EMS Sud",
+    "FEGERSHEIM-ESCHAU": "Compagnie de l'EMS Sud",
+    # Cas spéciaux ou libellés centralisés
+    "CIE HAGUENAU": "Compagnie de Haguenau",
+    "CIE SAVERNE": "Compagnie de Saverne",
+    "CIE MOLSHEIM": "Compagnie de Molsheim",
+    "CIE SELESTAT": "Compagnie de Sélestat",
+    "CIE EMS NORD": "Compagnie de l'EMS Nord",
+    "CIE EMS CENTRE": "Compagnie de l'EMS Centre",
+    "CIE EMS SUD": "Compagnie de l'EMS Sud",
+}
+
+# Nature de lésion → catégorie principale de blessure
+categories_blessure_mapping = {
+    "FRACTURE": "Osseuse",
+    "CONTUSION, HEMATOME": "Osseuse",
+    "ATTEINTE OSTEO-ARTICULAIRE ET/OU MUSCULAIRE (ENTORSE, DOULEURS D'EFFORT, ETC.)": "Ligamentaire",
+    "DECHIRURE MUSCULAIRE": "Musculaire",
+    "LUXATION": "Ligamentaire",
+    "DOULEURS,LUMBAGO": "Musculaire",
+    "HERNIE": "Musculaire",
+    "CHOC TRAUMATIQUE": "Osseuse",
+    "LESIONS INTERNES": "Osseuse",
+    "PLAIE": "Tendineuse",
+    "MORSURE": "Tendineuse",
+    "PIQURE": "Autres",
+    "BRULURE PHYSIQUE, CHIMIQUE": "Autres",
+    "PRESENCE DE CORPS ETRANGERS": "Autres",
+    "ELECTRISATION, ELECTROCUTION": "Autres",
+    "COMMOTION, PERTE DE CONNAISSANCE, MALAISE": "Autres",
+    "INTOXICATION PAR INGESTION, PAR INHALATION, PAR VOIE PERCUTANEE": "Autres",
+    "AUTRE NATURE DE LESION": "Autres",
+    "LESION POTENTIELLEMENT INFECTIEUSE DUE AU PRODUIT BIOLOGIQUE": "Autres",
+    "TROUBLES VISUELS": "Autres",
+    "CHOCS CONSECUTIFS A AGRESSION,MENACE": "Autres",
+    "REACTION ALLERGIQUE OU INFLAMMATOIRE CUTANEE OU MUQUEUSE": "Autres",
+    "TROUBLES AUDITIFS": "Autres",
+    "DERMITE": "Autres",
+    "LESIONS NERVEUSES": "Autres",
+    "LESIONS DE NATURE MULTIPLE": "Autres",
+}
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from sdis.aggregates import (
+    categorie_blessure,
+    count_by,
+    icp_table,
+    mean_duration_by,
+    means,
+)
+from sdis.filters import (
+    CLASSES_AGE,
+    CLASSES_IMC,
+    CLASSES_LUC_LEGER,
+    apply_filters,
+    between,
+    classes,
+    isin,
+)
+from sdis.loaders import load_accident, load_spp, load_spv
+
+# Requêtes sans serveur Streamlit : mêmes filtres et mêmes agrégats que les
+# pages, lus depuis un fichier JSON ou YAML et écrits en CSV ou Parquet.
+#
+#   python -m sdis.query requete.json -o resultats/ -f parquet
+#
+# Une requête (ou une liste de requêtes, le jeu de données n'étant chargé
+# qu'une fois) :
+#   {
+#     "nom": "ems-sud",
+#     "dataset": "spv",                        # spv, spp ou accident
+#     "filtres": {
+#       "cie_x": ["Cie EMS Sud"],              # liste → valeurs retenues
+#       "tranche_age": ["16 à 29", "30-39"],   # libellés des pages acceptés
+#       "poids": {"min": 50, "max": 100},      # bornes incluses
+#       "luc léger": {"classes": ["3", "plus de 6"]}
+#     },
+#     "agregats": ["effectif", "icp"],         # défaut : tous
+#     "par": "cie_x"                           # regroupement des moyennes
+#   }
+
+INDICATEURS = [
+    "poids",
+    "taille",
+    "imc",
+    "périmètre abdominal",
+    "tension artérielle systol",
+    "tension artérielle diastol",
+    "luc léger",
+    "pompes",
+    "tractions",
+    "vo2max",
+    "vo2max_leger",
+]
+
+DATASETS = {
+    "spv": {"load": load_spv, "icp": ["cie_x", "ut_x", "sexe", "tranche_age"]},
+    "spp": {"load": load_spp, "icp": ["cie", "ut", "sexe", "tranche_age"]},
+    "accident": {"load": load_accident},
+}
+
+# Répartitions des accidents : colonne, tri par valeur (sinon par effectif)
+REPARTITIONS_ACCIDENT = {
+    "par_annee": ("Année", True),
+    "par_jour": ("Jour_semaine", True),
+    "par_heure": ("Heure_accident", True),
+    "par_nature": ("Nature de l'accident", False),
+    "par_moment": ("Moment de l'accident", False),
+    "par_sport": ("Type de sport", False),
+    "par_compagnie": ("CIS normalisé", False),
+    "par_cis": ("CIS", False),
+}
+
+# Libellés des listes déroulantes des pages → catégories
+LIBELLES = {"tranche_age": CLASSES_AGE, "imc_cat": CLASSES_IMC}
+CLASSES = {"luc léger": CLASSES_LUC_LEGER}
+
+
+def parse_filters(df, filtres):
+    """Traduit les filtres d'une requête en filtres de sdis.filters."""
+    specs = []
+    for col, value in filtres.items():
+        if col not in df.columns:
+            raise ValueError(f"Colonne inconnue dans les filtres : {col}")
+        if isinstance(value, list):
+            libelles = LIBELLES.get(col, {})
+            valeurs = [libelles.get(v, v) for v in value]
+            _check_values(col, value, valeurs, _categories(df[col]))
+            specs.append(isin(col, valeurs))
+        elif not isinstance(value, dict):
+            raise ValueError(
+                f"Filtre invalide pour {col} : liste de valeurs ou objet "
+                f"(min/max, classes) attendu, pas {value!r}"
+            )
+        elif "classes" in value:
+            if col not in CLASSES:
+                raise ValueError(f"Pas de classes définies pour : {col}")
+            if not isinstance(value["classes"], list):
+                raise ValueError(f"Liste de classes attendue pour : {col}")
+            _check_values(col, value["classes"], value["classes"], CLASSES[col])
+            specs.append(classes(col, value["classes"], CLASSES[col]))
+        else:
+            specs.append(
+                between(
+                    col,
+                    value.get("min", -np.inf),
+                    value.get("max", np.inf),
+                    value.get("fillna"),
+                )
+            )
+    return specs
+
+
+def _categories(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return set(values.cat.categories)
+    return set(values.dropna().unique())
+
+
+def _check_values(col, demandees, valeurs, connues):
+    # Une valeur inconnue donnerait silencieusement un résultat vide ou partiel
+    inconnues = [d for d, v in zip(demandees, valeurs) if v not in connues]
+    if inconnues:
+        raise ValueError(
+            f"Valeurs inconnues pour {col} : {', '.join(map(str, inconnues))}"
+        )
+
+
+def fitness_aggregates(df, dataset, par=None):
+    yield "effectif", _effectif(df)
+    yield "moyennes", means(df, INDICATEURS, by=par)
+    for col in DATASETS[dataset]["icp"]:
+        yield f"icp_{col}", icp_table(df, col)
+
+
+def accident_aggregates(data):
+    yield "effectif", _effectif(data)
+    for name, (col, ordered) in REPARTITIONS_ACCIDENT.items():
+        yield name, count_by(data, col, ordered).to_frame()
+    yield "duree_par_lesion", mean_duration_by(data, "Nature lésion").to_frame()
+    yield "par_categorie", categorie_blessure(data).value_counts().to_frame()
+    yield "duree_arret", data["Durée totale arrêt"].describe().to_frame()
+
+
+def _effectif(df):
+    return pd.DataFrame({"effectif": [len(df)]})
+
+
+def run_query(query, datasets=None):
+    """Exécute une requête ; renvoie {nom de l'agrégat: DataFrame}.
+
+    `datasets` mémorise les jeux de données déjà chargés entre requêtes.
+    """
+    datasets = {} if datasets is None else datasets
+    dataset = query.get("dataset", "spv")
+    if dataset not in DATASETS:
+        raise ValueError(f"Jeu de données inconnu : {dataset}")
+    if dataset not in datasets:
+        datasets[dataset] = DATASETS[dataset]["load"]()
+    df = datasets[dataset]
+
+    df = apply_filters(df, parse_filters(df, query.get("filtres", {})))
+    if dataset == "accident":
+        results = accident_aggregates(df)
+    else:
+        results = fitness_aggregates(df, dataset, par=query.get("par"))
+    # "icp" sélectionne toutes les tables icp_<colonne>, "par" toutes les
+    # répartitions par_<dimension>
+    wanted = query.get("agregats")
+    return {
+        name: table
+        for name, table in results
+        if wanted is None or any(name == w or name.startswith(f"{w}_") for w in wanted)
+    }
+
+
+def load_queries(path):
+    """Lit une requête ou une liste de requêtes (JSON, ou YAML si PyYAML
+    est installé)."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("PyYAML est requis pour lire une requête YAML")
+            queries = yaml.safe_load(f)
+        else:
+            queries = json.load(f)
+    return queries if isinstance(queries, list) else [queries]
+
+
+def write_table(table, path, fmt):
+    if fmt == "parquet":
+        table = table.copy()
+        table.columns = table.columns.map(str)
+        table.to_parquet(path)
+    else:
+        table.to_csv(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m sdis.query",
+        description="Agrégats des tableaux de bord SPV/SPP/accidentologie.",
+    )
+    parser.add_argument("requete", help="fichier de requête JSON ou YAML")
+    parser.add_argument("-o", "--output", default=".", help="dossier de sortie")
+    parser.add_argument("-f", "--format", choices=["csv", "parquet"], default="csv")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    datasets = {}
+    for i, query in enumerate(load_queries(args.requete), start=1):
+        nom = query.get("nom", f"requete{i}")
+        try:
+            results = run_query(query, datasets)
+        except ValueError as e:
+            raise SystemExit(f"Requête {nom} : {e}")
+        for agregat, table in results.items():
+            path = os.path.join(args.output, f"{nom}-{agregat}.{args.format}")
+            write_table(table, path, args.format)
+            print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import numpy as np
+
+# Index de plage des colonnes numériques filtrées par curseur (VO2max,
+# tensions, tour de taille, poids). Construit une seule fois au chargement :
+# les positions des lignes triées par valeur (argsort) et les valeurs triées.
+# Un intervalle [min, max] se résout par deux recherches dichotomiques
+# (searchsorted) et donne directement les lignes retenues, sans comparer
+# toute la colonne. Les NaN sont tenus à part (exclus d'un intervalle, sauf
+# remplacement explicite par fillna).
+
+
+def build_range_index(values):
+    values = values.to_numpy(dtype="float64", na_value=np.nan)
+    missing = np.isnan(values)
+    rows = np.flatnonzero(~missing)
+    order = rows[np.argsort(values[rows], kind="stable")]
+    return {
+        "type": "range",
+        "n": len(values),
+        "order": order,
+        "sorted": values[order],
+        "nan_rows": np.flatnonzero(missing),
+    }
+
+
+def build_range_indexes(df, columns):
+    return {col: build_range_index(df[col]) for col in columns if col in df.columns}
+
+
+def range_rows(index, min_value, max_value, fillna=None):
+    """Lignes dont la valeur est dans [min_value, max_value].
+
+    Renvoie None si l'intervalle couvre toutes les lignes (filtre sans effet).
+    """
+    start = np.searchsorted(index["sorted"], min_value, side="left")
+    stop = np.searchsorted(index["sorted"], max_value, side="right")
+    keep_nan = fillna is not None and min_value <= fillna <= max_value
+    if start == 0 and stop == len(index["sorted"]):
+        if keep_nan or not len(index["nan_rows"]):
+            return None
+    rows = index["order"][start:stop]
+    if keep_nan:
+        rows = np.concatenate([rows, index["nan_rows"]])
+    return rows
+
+
+def rows_to_mask(rows, n):
+    mask = np.zeros(n, dtype=bool)
+    mask[rows] = True
+    return mask
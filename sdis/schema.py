@@ -0,0 +1,149 @@
+import pandas as pd
+
+# Schéma déclaratif des colonnes des fichiers source.
+# Pour chaque colonne (nom standardisé) :
+#   - dtype       : type final de la colonne
+#   - decimal     : séparateur décimal utilisé dans le CSV
+#   - scale       : facteur appliqué à la valeur lue (changement d'unité)
+#   - format      : pour dtype "datetime64[ns]", format(s) explicite(s) essayés
+#                   dans l'ordre (pas d'inférence, valeur invalide → NaT)
+#   - categories  : pour dtype "category", dictionnaire fixe partagé entre
+#                   les jeux de données (les valeurs imprévues sont ajoutées
+#                   à la suite, triées) ; ordered pour un ordre significatif
+SEXE_CATEGORIES = ["F", "M"]
+APTITUDE_CATEGORIES = [
+    "Apte",
+    "Apte avec restriction",
+    "Inapte temporaire",
+    "Inapte définitif",
+]
+JOURS_SEMAINE = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
+
+FITNESS_SCHEMA = {
+    "poids": {"dtype": "float64", "decimal": ","},
+    "taille": {"dtype": "float64", "decimal": ",", "scale": 0.01},  # cm → m
+    "imc": {"dtype": "float64", "decimal": ","},
+    "luc léger": {"dtype": "float64", "decimal": ","},
+    "périmètre abdominal": {"dtype": "float64", "decimal": ","},
+    "tension artérielle systol": {"dtype": "float64", "decimal": ","},
+    "tension artérielle diastol": {"dtype": "float64", "decimal": ","},
+    # Dimensions de faible cardinalité (colonnes suffixées _x/_y dans le SPV)
+    "cie": {"dtype": "category"},
+    "cie_x": {"dtype": "category"},
+    "ut": {"dtype": "category"},
+    "ut_x": {"dtype": "category"},
+    "sexe": {"dtype": "category", "categories": SEXE_CATEGORIES},
+    "aptitude générale": {"dtype": "category", "categories": APTITUDE_CATEGORIES},
+    "incendie et port de l'ari toutes missions": {
+        "dtype": "category",
+        "categories": APTITUDE_CATEGORIES,
+    },
+    "incendie et port de l'ari toutes missions_y": {
+        "dtype": "category",
+        "categories": APTITUDE_CATEGORIES,
+    },
+}
+
+DATE_FR = "%d/%m/%Y"
+DATE_FR_COURTE = "%d/%m/%y"
+DATE_ISO = "%Y-%m-%d"
+
+ACCIDENT_SCHEMA = {
+    # Matricule numérique, comme dans les fichiers SPV/SPP (jointure)
+    "Mat.": {"dtype": "Int64"},
+    "Date de l'accident": {"dtype": "datetime64[ns]", "format": DATE_FR},
+    "Date de naissance": {"dtype": "datetime64[ns]", "format": DATE_ISO},
+    "Entrée collectivité": {"dtype": "datetime64[ns]", "format": DATE_ISO},
+    "Date certificat": {"dtype": "datetime64[ns]", "format": DATE_FR},
+    "Date début initial": {"dtype": "datetime64[ns]", "format": DATE_FR},
+    "Date fin initial": {"dtype": "datetime64[ns]", "format": DATE_FR},
+    # Les prolongations mélangent années sur 2 et 4 chiffres
+    "Date début prol": {
+        "dtype": "datetime64[ns]",
+        "format": [DATE_FR_COURTE, DATE_FR],
+    },
+    "Date fin prol": {"dtype": "datetime64[ns]", "format": [DATE_FR, DATE_FR_COURTE]},
+    "Statut": {"dtype": "category", "categories": ["SPP", "SPV"]},
+    "Sexe": {"dtype": "category", "categories": SEXE_CATEGORIES},
+    "Grade": {"dtype": "category"},
+    "Cat.": {"dtype": "category"},
+    "Classe": {"dtype": "category"},
+    "Service": {"dtype": "category"},
+    "CIS": {"dtype": "category"},
+    "CIS normalisé": {"dtype": "category"},
+    "Nature de l'accident": {"dtype": "category"},
+    "Moment de l'accident": {"dtype": "category"},
+    "Lieu de l'accident": {"dtype": "category"},
+    "Elément matériel": {"dtype": "category"},
+    "Type de sport": {"dtype": "category"},
+    "Facteur potentiel": {"dtype": "category"},
+    "Motif": {"dtype": "category"},
+    "Nature lésion": {"dtype": "category"},
+    "Siège lésion": {"dtype": "category"},
+    "Latéralité de la blessure": {"dtype": "category"},
+}
+
+
+def to_category(values, spec):
+    """Encode une colonne en catégorielle avec un dictionnaire stable."""
+    categories = list(spec.get("categories", []))
+    known = set(categories)
+    extra = [v for v in values.dropna().unique() if v not in known]
+    categories += sorted(extra, key=str)
+    dtype = pd.CategoricalDtype(categories, ordered=spec.get("ordered", False))
+    return values.astype(dtype)
+
+
+def to_datetime(values, spec):
+    """Parse une colonne de dates avec des formats explicites."""
+    formats = spec["format"]
+    if isinstance(formats, str):
+        formats = [formats]
+    parsed = pd.to_datetime(values, format=formats[0], errors="coerce")
+    for fmt in formats[1:]:
+        missing = parsed.isna() & values.notna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(values[missing], format=fmt, errors="coerce")
+    return parsed
+
+
+def parse_column(values, spec):
+    """Convertit une colonne brute selon sa spécification, sans boucle Python."""
+    if spec["dtype"] == "category":
+        return to_category(values, spec)
+    if spec["dtype"].startswith("datetime64"):
+        return to_datetime(values, spec)
+
+    if not pd.api.types.is_numeric_dtype(values):
+        values = values.astype("string")
+        decimal = spec.get("decimal", ".")
+        if decimal != ".":
+            values = values.str.replace(decimal, ".", regex=False)
+        values = pd.to_numeric(values, errors="coerce")
+    values = values.astype(spec["dtype"])
+
+    if "scale" in spec:
+        values = values * spec["scale"]
+    return values
+
+
+def apply_schema(df, schema):
+    for col, spec in schema.items():
+        if col in df.columns:
+            df[col] = parse_column(df[col], spec)
+    return df
+
+
+def observed_categories(values):
+    """Catégories effectivement présentes, dans l'ordre du dictionnaire."""
+    present = set(values.dropna().unique())
+    return [c for c in values.cat.categories if c in present]
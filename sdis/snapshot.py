@@ -0,0 +1,182 @@
+import glob
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SNAPSHOT_DIR = os.path.join(ROOT_DIR, ".cache", "snapshots")
+
+
+def data_path(filename):
+    return os.path.join(ROOT_DIR, filename)
+
+
+def file_hash(path, size=None, chunk_size=1 << 20):
+    """Empreinte SHA-256 du contenu du fichier (ou de ses `size` premiers
+    octets), lue par blocs."""
+    digest = hashlib.sha256()
+    remaining = size
+    with open(path, "rb") as f:
+        while remaining is None or remaining > 0:
+            n = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = f.read(n)
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def source_signature(path):
+    """Signature bon marché (taille, date de modification) pour les clés de cache."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def dataset_version(df):
+    """Empreinte du CSV dont est issu un DataFrame chargé par load_snapshot."""
+    return df.attrs.get("source", {}).get("sha256")
+
+
+def snapshot_path(name, digest, version):
+    return os.path.join(SNAPSHOT_DIR, f"{name}-v{version}-{digest[:16]}.parquet")
+
+
+def _purge_old_snapshots(name, keep):
+    # Fichiers terminés uniquement : les .tmp d'une écriture en cours dans un
+    # autre processus ne sont jamais supprimés
+    paths = []
+    for pattern in (f"{name}-v*.parquet", f"{name}-v*.parquet.json"):
+        paths += glob.glob(os.path.join(SNAPSHOT_DIR, pattern))
+    for path in paths:
+        if not path.startswith(keep):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _read_snapshot(path, columns=None):
+    # Projection colonnaire : seules les colonnes demandées sont décodées
+    df = pd.read_parquet(path, columns=columns, memory_map=True)
+    # Métadonnées (df.attrs, ex. rapport de nettoyage) stockées à côté
+    if os.path.exists(f"{path}.json"):
+        with open(f"{path}.json", "r", encoding="utf-8") as f:
+            df.attrs.update(json.load(f))
+    return df
+
+
+def _previous_snapshot(name, version, source_path):
+    """Snapshot antérieur dont le CSV source est un préfixe du fichier actuel.
+
+    Renvoie (chemin, taille du CSV déjà ingéré) ou None. Seuls les ajouts en
+    fin de fichier sont reconnus : toute modification des lignes existantes
+    impose une reconstruction complète.
+    """
+    size = os.path.getsize(source_path)
+    candidates = sorted(
+        glob.glob(os.path.join(SNAPSHOT_DIR, f"{name}-v{version}-*.parquet")),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+    for path in candidates:
+        try:
+            with open(f"{path}.json", "r", encoding="utf-8") as f:
+                source = json.load(f).get("source")
+        except (OSError, ValueError):
+            continue
+        if not source or source["size"] >= size:
+            continue
+        # Un CSV sans saut de ligne final n'est prolongé proprement que si
+        # les octets ajoutés commencent par un saut de ligne (la ligne vide
+        # qui en résulte après l'en-tête est ignorée par read_csv)
+        if not source.get("complete_lines") and not _starts_new_line(
+            source_path, source["size"]
+        ):
+            continue
+        if file_hash(source_path, source["size"]) == source["sha256"]:
+            return path, source["size"]
+    return None
+
+
+def _starts_new_line(path, offset):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(2).startswith((b"\n", b"\r\n"))
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def load_snapshot(source_path, build, version=1, columns=None, append=None):
+    """Charge le snapshot Parquet d'un CSV source.
+
+    Le snapshot est identifié par l'empreinte du contenu du CSV et par
+    `version` (à incrémenter quand `build` change). S'il n'existe pas,
+    `build(source_path)` est appelé une seule fois pour produire le
+    DataFrame typé, qui est ensuite écrit puis relu en Parquet afin que
+    le chemin froid et le chemin chaud renvoient exactement les mêmes types.
+    `df.attrs` est conservé dans un fichier JSON voisin. `columns` limite
+    la lecture aux colonnes utiles à l'appelant.
+
+    Si `append` est fourni et que le CSV n'a fait que s'allonger depuis le
+    dernier snapshot, seules les lignes ajoutées sont traitées :
+    `append(previous_df, source_path, offset)` reçoit le snapshot précédent
+    et la position des nouveaux octets, et renvoie le DataFrame fusionné.
+    """
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    digest = file_hash(source_path)
+    path = snapshot_path(name, digest, version)
+    if os.path.exists(path):
+        return _read_snapshot(path, columns)
+
+    df = None
+    previous = append and _previous_snapshot(name, version, source_path)
+    if previous:
+        try:
+            df = append(_read_snapshot(previous[0]), source_path, previous[1])
+        except ValueError:
+            # Lignes ajoutées illisibles isolément : reconstruction complète
+            df = None
+    if df is None:
+        df = build(source_path)
+
+    # Empreinte du CSV ingéré, pour reconnaître un futur ajout en fin de fichier
+    df.attrs["source"] = {
+        "size": os.path.getsize(source_path),
+        "sha256": digest,
+        "complete_lines": _ends_with_newline(source_path),
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    tmp_json = f"{path}.json.{os.getpid()}.tmp"
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        df.to_parquet(tmp_path, index=False)
+        with open(tmp_json, "w", encoding="utf-8") as f:
+            json.dump(df.attrs, f, ensure_ascii=False)
+        # Les deux fichiers sont complets avant d'être mis en place, le JSON
+        # d'abord : un lecteur qui trouve le Parquet trouve aussi ses attrs
+        os.replace(tmp_json, f"{path}.json")
+        os.replace(tmp_path, path)
+    except OSError:
+        # Répertoire en lecture seule : on sert directement le résultat parsé
+        return df if columns is None else df[columns]
+    finally:
+        # Fichiers temporaires d'une écriture interrompue (y compris par une
+        # erreur de to_parquet)
+        for tmp in (tmp_path, tmp_json):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+    _purge_old_snapshots(name, keep=path)
+    return _read_snapshot(path, columns)